@@ -1,15 +1,21 @@
-from typing import Optional, List, cast, Union
+from typing import Optional, List, Set, cast
 
 import adsk.core
 import adsk.fusion
 
 from .geometry import updateDogFeature
-from .log import logger
+from .log import logger, startLogging, stopLogging
 from .commands import Action
+from .scheduler import UpdateScheduler
 from . import util
+from . import analysis
 from . import commands
 from . import options
+from . import parallel
 from . import geometry
+from . import profiling
+from . import recording
+from . import toolcache
 from . import ui
 
 # Global variable to hold the add-in (created in run(), destroyed in stop())
@@ -20,30 +26,61 @@ class CreateDogeCommand(commands.RunningCommandBase):
 
     def __init__(self, args: adsk.core.CommandCreatedEventArgs):
         super().__init__(args)
+        options.expressionCache.invalidate()
 
         defaults = options.DogeboneFeatureInput()
         self.ui = ui.DogeBoneUI(args.command.commandInputs, defaults)
         self.lastUsedInputs = defaults
+        # the plans of the selected faces, every face is analysed once when it's selected
+        self.analysis = analysis.FaceAnalysisCache()
+        # the topology of the bodies is read once while the dialog is open, the design doesn't change until execute
+        self.snapshot = geometry.TopologySnapshot()
+        self.preview = geometry.ToolBodyPreview()
 
     def onInputChanged(self, args: adsk.core.InputChangedEventArgs):
         self.ui.updateVisibility()
         self.ui.focusNextSelectionInput()
+        self.analyse()
+
+    def analyse(self):
+        """
+        plans the newly selected faces and drops the deselected ones, the faces selected before aren't planned again
+        """
+        analysed = self.analyseInputs()
+        if analysed is not None:
+            _, faces, plans = analysed
+            self.ui.setCornerCount(sum(len(plan.corners) for plan in plans), len(faces))
+
+    def analyseInputs(self):
+        """
+        returns the inputs, the selected native faces and their plans, or None if the tool diameter isn't valid
+        """
+        inputs = self.ui.createInputs(self.snapshot)
+        if inputs.toolDiameter is None or inputs.toolDiameter.value <= 0:
+            return None
+
+        faces = geometry.nativeFaces(list(inputs.faces.values()))
+        self.analysis.retain(face.entityToken for face in faces)
+        return inputs, faces, geometry.analyseFaces(faces, inputs, self.analysis, self.snapshot)
 
     def onValidate(self, args: adsk.core.ValidateInputsEventArgs):
         args.areInputsValid = self.ui.areInputsValid()
 
     def onExecutePreview(self, args: adsk.core.CommandEventArgs):
-        pass
-        # if self.ui.isPreviewEnabled():
-        #     if self.doExecute():
-        #         args.isValidResult = True
-        #         self.ui.setInputErrorMessage('')
-        #     else:
-        #         self.ui.setInputErrorMessage('Finger joints could not be completed. Try selecting overlapping bodies and double-check the dimensions.')
+        # the preview only draws the corners of the analysed faces, the features are created by execute
+        try:
+            analysed = self.analyseInputs()
+            if analysed is None:
+                self.preview.hide()
+                return
+            inputs, faces, plans = analysed
+            self.preview.show(faces, plans, inputs.toolDiameter.value)
+        except Exception as e:
+            logger.exception(e)
+            self.preview.hide()
 
     def onExecute(self, args: adsk.core.CommandEventArgs):
-        # We split onExecute and doExecute here so we can re-use the main functionality in
-        # onExecutePreview where we have to react differently to errors.
+        # errors of doExecute are logged and turn into a failed execute instead of an error dialog
         try:
             self.doExecute()
         except Exception as e:
@@ -52,49 +89,88 @@ class CreateDogeCommand(commands.RunningCommandBase):
             args.executeFailedMessage = 'Dogebones could not be completed'
 
     def doExecute(self):
-        pass
-        inputs = self.ui.createInputs()
+        self.preview.clear()
+        inputs = self.ui.createInputs(self.snapshot)
+        # creating the features modifies the bodies
+        self.snapshot = geometry.TopologySnapshot()
         self.lastUsedInputs = inputs
-        geometry.createDogeBones(inputs)
+        with profiling.profile(recording.CREATE), recording.record(recording.CREATE) as recorder:
+            if recorder:
+                # the trace has to replay without the analysis, so the faces are planned again
+                geometry.createDogeBones(recorder.recordInputs(inputs))
+            else:
+                geometry.createDogeBones(inputs, self.analysis)
 
     def onDestroy(self, args: adsk.core.CommandEventArgs):
         super().onDestroy(args)
+        self.preview.clear()
+        self.snapshot = geometry.TopologySnapshot()
         if args.terminationReason == adsk.core.CommandTerminationReason.CompletedTerminationReason:
             self.lastUsedInputs.writeDefaults()
 
 
 class UpdateDogeCommand(commands.RunningCommandBase):
 
+    def featuresToUpdate(
+        self, design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature], unchanged: Set[str]
+    ) -> List[adsk.fusion.BaseFeature]:
+        return features
+
     def onExecute(self, args):
+        with profiling.profile(recording.UPDATE), recording.record(recording.UPDATE, command=type(self).__name__):
+            self.doExecute()
+
+    def doExecute(self):
         app = adsk.core.Application.get()
         design: adsk.fusion.Design = cast(adsk.fusion.Design, app.activeProduct)
-
-        def processFeature(obj: adsk.fusion.TimelineObject):
-
-            if obj.entity.classType() == adsk.fusion.BaseFeature.classType():
-                feature = cast(adsk.fusion.BaseFeature, obj.entity)
-                updateDogFeature(feature, obj)
-
-        def processTimeline(timeline: Union[adsk.fusion.Timeline, adsk.fusion.TimelineGroup]):
-            for obj in timeline:
-                if obj.isGroup:
-                    group = cast(adsk.fusion.TimelineGroup, obj)
-                    isCollapsed = group.isCollapsed
-                    group.isCollapsed = False
-                    processTimeline(group)
-                    group.isCollapsed = isCollapsed
-                else:
-                    processFeature(obj)
-
-        position = design.timeline.markerPosition
+        options.expressionCache.invalidate()
+
+        updated = 0
+
+        # only the timeline objects of dogbone features are visited, found through their attributes
+        with profiling.profiler.stage('find'):
+            features = geometry.findDogFeatures(design)
+        # features whose faces are unchanged only need their stored corners placed for the current tool diameter
+        unchanged = geometry.findUnchangedFeatures(design, features)
+        objects = [feature.timelineObject for feature in self.featuresToUpdate(design, features, unchanged)]
+
+        # keep the groups expanded while rolling, like when walking the timeline
+        collapsedGroups = []
+        for obj in objects:
+            group = obj.parentGroup
+            if group is not None and group.isCollapsed and group not in collapsedGroups:
+                collapsedGroups.append(group)
+                group.isCollapsed = False
+
+        scheduler = UpdateScheduler(design.timeline)
         try:
-            processTimeline(design.timeline)
+            for obj in objects:
+                feature = cast(adsk.fusion.BaseFeature, obj.entity)
+                with profiling.profiler.feature(feature):
+                    if updateDogFeature(feature, obj, scheduler, feature.entityToken in unchanged):
+                        updated += 1
         finally:
-            design.timeline.markerPosition = position
+            with profiling.profiler.stage('rollTo'):
+                scheduler.finish()
+            for group in collapsedGroups:
+                group.isCollapsed = True
+
+        logger.info("Updated %d of %d dogbone features", updated, len(objects))
+        logger.info("Tool body cache: %s", toolcache.toolBodyCache.summary())
+        with profiling.profiler.stage('state'):
+            geometry.recordUpdateState(design, features)
 
         # logger.warning(feature.name)
 
 
+class UpdateAffectedDogeCommand(UpdateDogeCommand):
+
+    def featuresToUpdate(
+        self, design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature], unchanged: Set[str]
+    ) -> List[adsk.fusion.BaseFeature]:
+        return geometry.findAffectedFeatures(design, features, unchanged)
+
+
 class DogeAddIn(commands.AddIn):
     def _prefix(self) -> str:
         return 'tfDoge'
@@ -102,7 +178,9 @@ class DogeAddIn(commands.AddIn):
     def actions(self) -> List[Action]:
         return [
             Action('create', 'Create Dogbone', 'Creates dogbones for given faces', 'resources/ui/create_button', CreateDogeCommand),
-            Action('update', 'Update Dogbones', 'Update all dogbones', 'resources/ui/update_button', UpdateDogeCommand)
+            Action('update', 'Update Dogbones', 'Update all dogbones', 'resources/ui/update_button', UpdateDogeCommand),
+            Action('updateAffected', 'Update Affected Dogbones', 'Update the dogbones whose parameters or faces have changed',
+                   'resources/ui/update_button', UpdateAffectedDogeCommand)
         ]
 
 
@@ -111,6 +189,7 @@ def run(_context):
     try:
         if addIn is not None:
             stop({'IsApplicationClosing': False})
+        startLogging()
         addIn = DogeAddIn()
         addIn.addToUi()
     except Exception as e:
@@ -125,3 +204,6 @@ def stop(_context):
         addIn.removeFromUI()
 
     addIn = None
+    parallel.planningPool.shutdown()
+    toolcache.toolBodyCache.clear()
+    stopLogging()
@@ -0,0 +1,47 @@
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .planner import DogbonePlan, placeCorner
+
+# While the create dialog is open, every face is analysed once, when it's selected. The plans are kept until
+# the face is deselected and reused by the following selections, the preview and the execute.
+
+
+class FaceAnalysisCache(object):
+    """
+    Keeps the plan of every analysed face, keyed by the entityToken of the native face. The plans are for the
+    tool diameter of the last lookup, when it changes the cached corners are placed again without the topology.
+    """
+
+    def __init__(self):
+        self._plans: Dict[str, DogbonePlan] = {}
+        self._toolDiameter: Optional[float] = None
+
+    def plans(self, faceTokens: List[str], toolDiameter: float, plan: Callable[[List[str]], List[DogbonePlan]]) -> List[DogbonePlan]:
+        """
+        returns the plans of the faces, plan is called once with the faces that haven't been analysed yet.
+        The plans are copies, the caller can change their corners.
+        """
+        if toolDiameter != self._toolDiameter:
+            for cached in self._plans.values():
+                cached.corners = [
+                    placeCorner(corner.edgeToken, corner.edgeStart, corner.edgeEnd, corner.corner, corner.angle, toolDiameter)
+                    for corner in cached.corners
+                ]
+            self._toolDiameter = toolDiameter
+
+        missing = [token for token in dict.fromkeys(faceTokens) if token not in self._plans]
+        if missing:
+            self._plans.update(zip(missing, plan(missing)))
+
+        return [
+            DogbonePlan(cached.faceToken, cached.bodyToken, list(cached.corners))
+            for cached in (self._plans[token] for token in faceTokens)
+        ]
+
+    def retain(self, faceTokens: Iterable[str]):
+        """
+        drops the plans of the faces that aren't selected anymore
+        """
+        selected = set(faceTokens)
+        for token in [token for token in self._plans if token not in selected]:
+            del self._plans[token]
@@ -0,0 +1,587 @@
+"""
+Pure-Python stand-in for the subset of adsk.core used by the add-in.
+"""
+import math
+import re
+from typing import List, Optional
+
+
+class Base(object):
+    _classType = 'adsk::core::Base'
+
+    @classmethod
+    def classType(cls):
+        return cls._classType
+
+    @property
+    def objectType(self):
+        return self._classType
+
+    @classmethod
+    def cast(cls, obj):
+        return obj
+
+    @property
+    def isValid(self):
+        return True
+
+
+class Vector3D(Base):
+    _classType = 'adsk::core::Vector3D'
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Vector3D(x, y, z)
+
+    @property
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def asArray(self):
+        return [self.x, self.y, self.z]
+
+    def copy(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def add(self, other):
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return True
+
+    def subtract(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        self.z -= other.z
+        return True
+
+    def scaleBy(self, factor):
+        self.x *= factor
+        self.y *= factor
+        self.z *= factor
+        return True
+
+    def normalize(self):
+        length = self.length
+        if length == 0:
+            return False
+        self.scaleBy(1 / length)
+        return True
+
+    def dotProduct(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def crossProduct(self, other):
+        return Vector3D(
+            self.y * other.z - self.z * other.y,
+            self.z * other.x - self.x * other.z,
+            self.x * other.y - self.y * other.x,
+        )
+
+    def angleTo(self, other):
+        norm = self.length * other.length
+        if norm == 0:
+            return 0
+        return math.acos(max(-1.0, min(1.0, self.dotProduct(other) / norm)))
+
+    def isParallelTo(self, other):
+        angle = self.angleTo(other)
+        tolerance = Application.get().vectorAngleTolerance
+        return angle <= tolerance or math.pi - angle <= tolerance
+
+    def isPerpendicularTo(self, other):
+        return abs(self.angleTo(other) - math.pi / 2) <= Application.get().vectorAngleTolerance
+
+    def isEqualTo(self, other):
+        tolerance = Application.get().pointTolerance
+        return abs(self.x - other.x) <= tolerance and abs(self.y - other.y) <= tolerance and abs(self.z - other.z) <= tolerance
+
+    def asPoint(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix._apply(self.x, self.y, self.z, 0.0)
+        return True
+
+
+class Point3D(Base):
+    _classType = 'adsk::core::Point3D'
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        return Point3D(x, y, z)
+
+    def asArray(self):
+        return [self.x, self.y, self.z]
+
+    def copy(self):
+        return Point3D(self.x, self.y, self.z)
+
+    def vectorTo(self, other):
+        return Vector3D(other.x - self.x, other.y - self.y, other.z - self.z)
+
+    def translateBy(self, vector):
+        self.x += vector.x
+        self.y += vector.y
+        self.z += vector.z
+        return True
+
+    def distanceTo(self, other):
+        return self.vectorTo(other).length
+
+    def isEqualTo(self, other):
+        return self.distanceTo(other) <= Application.get().pointTolerance
+
+    def asVector(self):
+        return Vector3D(self.x, self.y, self.z)
+
+    def transformBy(self, matrix):
+        self.x, self.y, self.z = matrix._apply(self.x, self.y, self.z, 1.0)
+        return True
+
+
+class Matrix3D(Base):
+    _classType = 'adsk::core::Matrix3D'
+
+    def __init__(self):
+        self._m = [[1.0 if i == j else 0.0 for j in range(4)] for i in range(4)]
+
+    @staticmethod
+    def create():
+        return Matrix3D()
+
+    def copy(self):
+        matrix = Matrix3D()
+        matrix._m = [row[:] for row in self._m]
+        return matrix
+
+    def _apply(self, x, y, z, w):
+        m = self._m
+        return (
+            m[0][0] * x + m[0][1] * y + m[0][2] * z + m[0][3] * w,
+            m[1][0] * x + m[1][1] * y + m[1][2] * z + m[1][3] * w,
+            m[2][0] * x + m[2][1] * y + m[2][2] * z + m[2][3] * w,
+        )
+
+    def setToIdentity(self):
+        self.__init__()
+        return True
+
+    def setCell(self, row, column, value):
+        self._m[row][column] = value
+        return True
+
+    def getCell(self, row, column):
+        return self._m[row][column]
+
+    @property
+    def translation(self):
+        return Vector3D(self._m[0][3], self._m[1][3], self._m[2][3])
+
+    @translation.setter
+    def translation(self, vector):
+        self._m[0][3], self._m[1][3], self._m[2][3] = vector.x, vector.y, vector.z
+
+    def transformBy(self, matrix):
+        a, b = matrix._m, self._m
+        self._m = [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+        return True
+
+    def setWithCoordinateSystem(self, origin, xAxis, yAxis, zAxis):
+        self.__init__()
+        for column, axis in enumerate((xAxis, yAxis, zAxis)):
+            self._m[0][column], self._m[1][column], self._m[2][column] = axis.x, axis.y, axis.z
+        self._m[0][3], self._m[1][3], self._m[2][3] = origin.x, origin.y, origin.z
+        return True
+
+    def setToAlignCoordinateSystems(self, fromOrigin, fromXAxis, fromYAxis, fromZAxis, toOrigin, toXAxis, toYAxis, toZAxis):
+        # only orthonormal systems are supported: to * from^T
+        frm = Matrix3D()
+        frm.setWithCoordinateSystem(Point3D(), fromXAxis, fromYAxis, fromZAxis)
+        to = Matrix3D()
+        to.setWithCoordinateSystem(Point3D(), toXAxis, toYAxis, toZAxis)
+        rotation = [[sum(to._m[i][k] * frm._m[j][k] for k in range(3)) for j in range(3)] for i in range(3)]
+        self.__init__()
+        for i in range(3):
+            for j in range(3):
+                self._m[i][j] = rotation[i][j]
+        rotated = self._apply(fromOrigin.x, fromOrigin.y, fromOrigin.z, 1.0)
+        self._m[0][3], self._m[1][3], self._m[2][3] = toOrigin.x - rotated[0], toOrigin.y - rotated[1], toOrigin.z - rotated[2]
+        return True
+
+    def setToRotation(self, angle, axis, origin):
+        axis = axis.copy()
+        axis.normalize()
+        c, s, t = math.cos(angle), math.sin(angle), 1 - math.cos(angle)
+        x, y, z = axis.x, axis.y, axis.z
+        rotation = [
+            [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+            [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+            [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+        ]
+        self.__init__()
+        for i in range(3):
+            for j in range(3):
+                self._m[i][j] = rotation[i][j]
+        rotated = self._apply(origin.x, origin.y, origin.z, 1.0)
+        self._m[0][3], self._m[1][3], self._m[2][3] = origin.x - rotated[0], origin.y - rotated[1], origin.z - rotated[2]
+        return True
+
+
+class BoundingBox3D(Base):
+    _classType = 'adsk::core::BoundingBox3D'
+
+    def __init__(self, minPoint, maxPoint):
+        self.minPoint = minPoint
+        self.maxPoint = maxPoint
+
+    @staticmethod
+    def create(minPoint, maxPoint):
+        return BoundingBox3D(minPoint.copy(), maxPoint.copy())
+
+    def copy(self):
+        return BoundingBox3D(self.minPoint.copy(), self.maxPoint.copy())
+
+    def intersects(self, other):
+        return (
+            self.minPoint.x <= other.maxPoint.x and other.minPoint.x <= self.maxPoint.x
+            and self.minPoint.y <= other.maxPoint.y and other.minPoint.y <= self.maxPoint.y
+            and self.minPoint.z <= other.maxPoint.z and other.minPoint.z <= self.maxPoint.z
+        )
+
+    def combine(self, other):
+        self.minPoint = Point3D(min(self.minPoint.x, other.minPoint.x), min(self.minPoint.y, other.minPoint.y), min(self.minPoint.z, other.minPoint.z))
+        self.maxPoint = Point3D(max(self.maxPoint.x, other.maxPoint.x), max(self.maxPoint.y, other.maxPoint.y), max(self.maxPoint.z, other.maxPoint.z))
+        return True
+
+    def expand(self, point):
+        return self.combine(BoundingBox3D(point, point))
+
+    def contains(self, point):
+        return (
+            self.minPoint.x <= point.x <= self.maxPoint.x
+            and self.minPoint.y <= point.y <= self.maxPoint.y
+            and self.minPoint.z <= point.z <= self.maxPoint.z
+        )
+
+
+class OrientedBoundingBox3D(Base):
+    _classType = 'adsk::core::OrientedBoundingBox3D'
+
+    def __init__(self, centerPoint, lengthDirection, widthDirection, length, width, height):
+        self.centerPoint = centerPoint
+        self.lengthDirection = lengthDirection
+        self.widthDirection = widthDirection
+        self.heightDirection = lengthDirection.crossProduct(widthDirection)
+        self.length = length
+        self.width = width
+        self.height = height
+
+    @staticmethod
+    def create(centerPoint, lengthDirection, widthDirection, length, width, height):
+        return OrientedBoundingBox3D(centerPoint.copy(), lengthDirection.copy(), widthDirection.copy(), length, width, height)
+
+
+class Plane(Base):
+    _classType = 'adsk::core::Plane'
+
+    def __init__(self, origin, normal):
+        self.origin = origin
+        self.normal = normal
+
+    @staticmethod
+    def create(origin, normal):
+        return Plane(origin.copy(), normal.copy())
+
+
+class Cylinder(Base):
+    _classType = 'adsk::core::Cylinder'
+
+
+class Curve3DTypes:
+    Line3DCurveType = 0
+    Arc3DCurveType = 1
+    Circle3DCurveType = 2
+
+
+class Line3D(Base):
+    _classType = 'adsk::core::Line3D'
+    curveType = Curve3DTypes.Line3DCurveType
+
+    def __init__(self, startPoint, endPoint):
+        self.startPoint = startPoint
+        self.endPoint = endPoint
+
+
+class ObjectCollection(Base):
+    _classType = 'adsk::core::ObjectCollection'
+
+    def __init__(self):
+        self._items = []
+
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+    def item(self, index):
+        return self._items[index]
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+
+class ValueInput(Base):
+    _classType = 'adsk::core::ValueInput'
+
+    def __init__(self, stringValue=None, realValue=None):
+        self.stringValue = stringValue
+        self.realValue = realValue
+
+    @staticmethod
+    def createByString(value):
+        return ValueInput(stringValue=value)
+
+    @staticmethod
+    def createByReal(value):
+        return ValueInput(realValue=value)
+
+
+# Units manager ---------------------------------------------------------------------------------------------------
+
+_UNITS = {'mm': 0.1, 'cm': 1.0, 'm': 100.0, 'in': 2.54, 'ft': 30.48}
+_TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+)|([A-Za-z_][A-Za-z_0-9]*)|(.))')
+
+
+class _ExpressionParser(object):
+    def __init__(self, expression, parameters):
+        self.tokens = [t for t in _TOKEN.findall(expression) if any(t)]
+        self.position = 0
+        self.parameters = parameters
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        value = self.expression()
+        if self.peek() is not None:
+            raise ValueError('unexpected token')
+        return value
+
+    def expression(self):
+        value = self.term()
+        while self.peek() and self.peek()[2] in '+-':
+            op = self.take()[2]
+            right = self.term()
+            value = value + right if op == '+' else value - right
+        return value
+
+    def term(self):
+        value = self.factor()
+        while self.peek() and self.peek()[2] in '*/':
+            op = self.take()[2]
+            right = self.factor()
+            value = value * right if op == '*' else value / right
+        return value
+
+    def factor(self):
+        token = self.take()
+        if token is None:
+            raise ValueError('unexpected end')
+        number, name, symbol = token
+        if symbol == '-':
+            return -self.factor()
+        if symbol == '(':
+            value = self.expression()
+            if self.take() != ('', '', ')'):
+                raise ValueError('missing )')
+            return value
+        if number:
+            value = float(number)
+            following = self.peek()
+            if following and following[1] in _UNITS:
+                self.take()
+                return value * _UNITS[following[1]]
+            return value * _UNITS[self.parameters.defaultUnits]
+        if name:
+            if name in _UNITS:
+                return _UNITS[name]
+            parameter = self.parameters.itemByName(name)
+            if parameter is None:
+                raise ValueError('unknown parameter ' + name)
+            return parameter.value
+        raise ValueError('unexpected symbol ' + symbol)
+
+
+def referencedNames(expression):
+    return [t[1] for t in _TOKEN.findall(expression) if t[1] and t[1] not in _UNITS]
+
+
+class UnitsManager(Base):
+    _classType = 'adsk::fusion::FusionUnitsManager'
+
+    def __init__(self, design):
+        self._design = design
+        self.defaultLengthUnits = 'mm'
+        self.evaluations = 0
+
+    def _parameters(self):
+        parameters = self._design.allParameters
+        parameters.defaultUnits = self.defaultLengthUnits
+        return parameters
+
+    def evaluateExpression(self, expression, units=None):
+        self.evaluations += 1
+        return _ExpressionParser(expression, self._parameters()).parse()
+
+    def isValidExpression(self, expression, units):
+        self.evaluations += 1
+        try:
+            _ExpressionParser(expression, self._parameters()).parse()
+            return True
+        except (ValueError, ZeroDivisionError, TypeError, IndexError):
+            return False
+
+    def formatInternalValue(self, value, units=None, showUnits=True):
+        return '{} cm'.format(value)
+
+
+# Application -----------------------------------------------------------------------------------------------------
+
+class UserInterface(Base):
+    _classType = 'adsk::core::UserInterface'
+
+    def __init__(self):
+        self.messages: List[str] = []
+
+    def messageBox(self, message, *args):
+        self.messages.append(message)
+        return 0
+
+
+class Application(Base):
+    _classType = 'adsk::core::Application'
+    _instance: Optional['Application'] = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.pointTolerance = 1e-08
+        self.vectorAngleTolerance = 1e-08
+        self.activeProduct = None
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+            from . import fusion
+            Application._instance.activeProduct = fusion.Design()
+        return Application._instance
+
+    @staticmethod
+    def reset():
+        """
+        stand-in only: empties the active design. The design and its root component stay the same
+        objects, modules that kept a reference to them when they were imported keep working.
+        """
+        design = Application.get().activeProduct
+        design.clear()
+        return design
+
+
+# Commands, inputs and events (only what's needed to construct the add-in classes) -------------------------------
+
+class EventHandler(object):
+    def __init__(self):
+        pass
+
+    def notify(self, args):
+        pass
+
+
+class InputChangedEventHandler(EventHandler):
+    pass
+
+
+class SelectionEventHandler(EventHandler):
+    pass
+
+
+class ValidateInputsEventHandler(EventHandler):
+    pass
+
+
+class CommandEventHandler(EventHandler):
+    pass
+
+
+class CommandCreatedEventHandler(EventHandler):
+    pass
+
+
+class CommandTerminationReason:
+    UnknownTerminationReason = 0
+    CompletedTerminationReason = 1
+    CancelledTerminationReason = 2
+
+
+class Command(Base):
+    _classType = 'adsk::core::Command'
+
+
+class SelectionCommandInput(Base):
+    _classType = 'adsk::core::SelectionCommandInput'
+    PlanarFaces = 'PlanarFaces'
+    SolidBodies = 'SolidBodies'
+    Bodies = 'Bodies'
+
+
+class ValueCommandInput(Base):
+    _classType = 'adsk::core::ValueCommandInput'
+
+
+class ButtonRowCommandInput(Base):
+    _classType = 'adsk::core::ButtonRowCommandInput'
+
+
+class CommandInputs(Base):
+    _classType = 'adsk::core::CommandInputs'
+
+
+class InputChangedEventArgs(Base):
+    pass
+
+
+class ValidateInputsEventArgs(Base):
+    pass
+
+
+class CommandEventArgs(Base):
+    pass
+
+
+class CommandCreatedEventArgs(Base):
+    pass
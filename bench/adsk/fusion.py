@@ -0,0 +1,883 @@
+"""
+Pure-Python stand-in for the subset of adsk.fusion used by the add-in.
+
+B-Rep bodies are plain polyhedra: faces with vertex loops, edges shared between two faces.
+Temporary bodies only keep a list of the primitive shapes they're made of, booleans and
+feature recomputes are counted but don't change any geometry.
+"""
+import itertools
+from typing import Dict, List
+
+from . import core
+from .core import Base, BoundingBox3D, Point3D, Vector3D
+
+_tokens = itertools.count(1)
+
+
+def _newToken(prefix):
+    return '{}{}'.format(prefix, next(_tokens))
+
+
+class Collection(Base):
+    _classType = 'adsk::core::Collection'
+
+    def __init__(self, items=None):
+        self._items = list(items) if items is not None else []
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index] if 0 <= index < len(self._items) else None
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, item):
+        return any(item is i for i in self._items)
+
+
+# Attributes --------------------------------------------------------------------------------------------------------
+
+class Attribute(Base):
+    _classType = 'adsk::core::Attribute'
+
+    def __init__(self, parent, groupName, name, value):
+        self.parent = parent
+        self.groupName = groupName
+        self.name = name
+        self.value = value
+
+    def deleteMe(self):
+        self.parent.attributes._remove(self)
+        return True
+
+
+class Attributes(Collection):
+    _classType = 'adsk::core::Attributes'
+
+    def __init__(self, parent, design):
+        super().__init__()
+        self._parent = parent
+        self._design = design
+
+    def add(self, groupName, name, value):
+        existing = self.itemByName(groupName, name)
+        if existing:
+            existing.value = value
+            return existing
+        attribute = Attribute(self._parent, groupName, name, value)
+        self._items.append(attribute)
+        if self._design is not None:
+            self._design._attributes.append(attribute)
+        return attribute
+
+    def _remove(self, attribute):
+        self._items.remove(attribute)
+        if self._design is not None:
+            self._design._attributes.remove(attribute)
+
+    def itemByName(self, groupName, name):
+        for attribute in self._items:
+            if attribute.groupName == groupName and attribute.name == name:
+                return attribute
+        return None
+
+    def itemsByGroup(self, groupName):
+        return [attribute for attribute in self._items if attribute.groupName == groupName]
+
+
+# B-Rep -------------------------------------------------------------------------------------------------------------
+
+class _Entity(Base):
+    def __init__(self, design, prefix):
+        self.entityToken = _newToken(prefix)
+        self._design = design
+        if design is not None:
+            design._entities[self.entityToken] = self
+        self._attributeCollection = None
+
+    @property
+    def attributes(self):
+        if self._attributeCollection is None:
+            self._attributeCollection = Attributes(self, self._design)
+        return self._attributeCollection
+
+    @property
+    def nativeObject(self):
+        return None
+
+    @property
+    def assemblyContext(self):
+        return None
+
+    def createForAssemblyContext(self, occurrence):
+        return _Proxy(self, occurrence)
+
+
+class _Proxy(_Entity):
+    """
+    an entity seen through an occurrence. Unlike in Fusion its geometry isn't transformed,
+    the add-in only works on the native object.
+    """
+
+    def __init__(self, native, occurrence):
+        super().__init__(native._design, native.entityToken + '@')
+        self._native = native
+        self._occurrence = occurrence
+
+    @property
+    def nativeObject(self):
+        return self._native
+
+    @property
+    def assemblyContext(self):
+        return self._occurrence
+
+    @property
+    def objectType(self):
+        return self._native.objectType
+
+    def __getattr__(self, name):
+        return getattr(self._native, name)
+
+
+class BRepVertex(_Entity):
+    _classType = 'adsk::fusion::BRepVertex'
+
+    def __init__(self, design, body, point):
+        super().__init__(design, 'v')
+        self.body = body
+        self._point = point
+        self._edges: List['BRepEdge'] = []
+
+    @property
+    def geometry(self):
+        return self._point.copy()
+
+    @property
+    def edges(self):
+        return Collection(self._edges)
+
+    @property
+    def faces(self):
+        faces = []
+        for edge in self._edges:
+            for face in edge.faces:
+                if face not in faces:
+                    faces.append(face)
+        return Collection(faces)
+
+
+class BRepEdge(_Entity):
+    _classType = 'adsk::fusion::BRepEdge'
+
+    def __init__(self, design, body, startVertex, endVertex):
+        super().__init__(design, 'e')
+        self.body = body
+        self.startVertex = startVertex
+        self.endVertex = endVertex
+        self._coEdges: List['BRepCoEdge'] = []
+        self.isDegenerate = False
+        startVertex._edges.append(self)
+        endVertex._edges.append(self)
+
+    @property
+    def geometry(self):
+        return core.Line3D(self.startVertex.geometry, self.endVertex.geometry)
+
+    @property
+    def length(self):
+        return self.startVertex.geometry.distanceTo(self.endVertex.geometry)
+
+    @property
+    def coEdges(self):
+        return Collection(self._coEdges)
+
+    @property
+    def faces(self):
+        return Collection([coEdge.loop.face for coEdge in self._coEdges])
+
+
+class BRepCoEdge(Base):
+    _classType = 'adsk::fusion::BRepCoEdge'
+
+    def __init__(self, edge, loop, isOpposedToEdge):
+        self.edge = edge
+        self.loop = loop
+        self.isOpposedToEdge = isOpposedToEdge
+
+
+class BRepLoop(Base):
+    _classType = 'adsk::fusion::BRepLoop'
+
+    def __init__(self, face, isOuter):
+        self.face = face
+        self.isOuter = isOuter
+        self._coEdges: List[BRepCoEdge] = []
+
+    @property
+    def coEdges(self):
+        return Collection(self._coEdges)
+
+    @property
+    def edges(self):
+        return Collection([coEdge.edge for coEdge in self._coEdges])
+
+
+class SurfaceEvaluator(Base):
+    _classType = 'adsk::core::SurfaceEvaluator'
+
+    def __init__(self, face):
+        self._face = face
+
+    def getNormalAtPoint(self, point):
+        return True, self._face._normal.copy()
+
+
+class BRepFace(_Entity):
+    _classType = 'adsk::fusion::BRepFace'
+
+    def __init__(self, design, body, normal, pointOnFace):
+        super().__init__(design, 'f')
+        self.body = body
+        self._normal = normal
+        self._point = pointOnFace
+        self._loops: List[BRepLoop] = []
+
+    @property
+    def geometry(self):
+        return core.Plane(self._point.copy(), self._normal.copy())
+
+    @property
+    def pointOnFace(self):
+        return self._point.copy()
+
+    @property
+    def evaluator(self):
+        return SurfaceEvaluator(self)
+
+    @property
+    def loops(self):
+        return Collection(self._loops)
+
+    @property
+    def edges(self):
+        return Collection([coEdge.edge for loop in self._loops for coEdge in loop._coEdges])
+
+    @property
+    def vertices(self):
+        vertices = []
+        seen = set()
+        for loop in self._loops:
+            for coEdge in loop._coEdges:
+                for vertex in (coEdge.edge.startVertex, coEdge.edge.endVertex):
+                    if id(vertex) not in seen:
+                        seen.add(id(vertex))
+                        vertices.append(vertex)
+        return Collection(vertices)
+
+    @property
+    def boundingBox(self):
+        points = [vertex._point for vertex in self.vertices]
+        box = BoundingBox3D(points[0].copy(), points[0].copy())
+        for point in points[1:]:
+            box.expand(point)
+        return box
+
+
+class BRepBody(_Entity):
+    _classType = 'adsk::fusion::BRepBody'
+
+    def __init__(self, design, component=None, isTemporary=False):
+        super().__init__(design, 'b')
+        self.name = 'Body'
+        self.parentComponent = component
+        self.isTemporary = isTemporary
+        self._faces: List[BRepFace] = []
+        self._edges: List[BRepEdge] = []
+        self._vertices: List[BRepVertex] = []
+        # primitive shapes of temporary bodies: (kind, bounding box)
+        self._shapes = []
+        self.isVisible = True
+
+    @property
+    def faces(self):
+        return Collection(self._faces)
+
+    @property
+    def edges(self):
+        return Collection(self._edges)
+
+    @property
+    def vertices(self):
+        return Collection(self._vertices)
+
+    @property
+    def lumps(self):
+        return Collection(self._shapes)
+
+    @property
+    def boundingBox(self):
+        if self._shapes:
+            box = self._shapes[0][1].copy()
+            for _, shapeBox in self._shapes[1:]:
+                box.combine(shapeBox)
+            return box
+        points = [vertex._point for vertex in self._vertices]
+        box = BoundingBox3D(points[0].copy(), points[0].copy())
+        for point in points[1:]:
+            box.expand(point)
+        return box
+
+    def deleteMe(self):
+        if self.parentComponent and self in self.parentComponent.bRepBodies:
+            self.parentComponent.bRepBodies._items.remove(self)
+        return True
+
+
+class TemporaryBRepManager(Base):
+    _classType = 'adsk::fusion::TemporaryBRepManager'
+    _instance = None
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager._instance is None:
+            TemporaryBRepManager._instance = TemporaryBRepManager()
+        return TemporaryBRepManager._instance
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    @staticmethod
+    def _body(kind, points, margin=0.0):
+        body = BRepBody(None, isTemporary=True)
+        box = BoundingBox3D(points[0].copy(), points[0].copy())
+        for point in points[1:]:
+            box.expand(point)
+        box.minPoint.translateBy(Vector3D(-margin, -margin, -margin))
+        box.maxPoint.translateBy(Vector3D(margin, margin, margin))
+        body._shapes.append((kind, box))
+        return body
+
+    def createCylinderOrCone(self, pointOne, pointOneRadius, pointTwo, pointTwoRadius):
+        self._count('createCylinderOrCone')
+        return self._body('cylinder', [pointOne, pointTwo], max(pointOneRadius, pointTwoRadius))
+
+    def createBox(self, box):
+        self._count('createBox')
+        center = box.centerPoint
+        points = []
+        for sl in (-0.5, 0.5):
+            for sw in (-0.5, 0.5):
+                for sh in (-0.5, 0.5):
+                    point = center.copy()
+                    for direction, size, sign in ((box.lengthDirection, box.length, sl), (box.widthDirection, box.width, sw),
+                                                  (box.heightDirection, box.height, sh)):
+                        offset = direction.copy()
+                        offset.normalize()
+                        offset.scaleBy(size * sign)
+                        point.translateBy(offset)
+                    points.append(point)
+        return self._body('box', points)
+
+    def copy(self, body):
+        self._count('copy')
+        copied = BRepBody(None, isTemporary=True)
+        copied._shapes = [(kind, box.copy()) for kind, box in body._shapes]
+        return copied
+
+    def transform(self, body, transform):
+        self._count('transform')
+        shapes = []
+        for kind, box in body._shapes:
+            corners = []
+            for x in (box.minPoint.x, box.maxPoint.x):
+                for y in (box.minPoint.y, box.maxPoint.y):
+                    for z in (box.minPoint.z, box.maxPoint.z):
+                        point = Point3D(x, y, z)
+                        point.transformBy(transform)
+                        corners.append(point)
+            moved = BoundingBox3D(corners[0].copy(), corners[0].copy())
+            for point in corners[1:]:
+                moved.expand(point)
+            shapes.append((kind, moved))
+        body._shapes = shapes
+        return True
+
+    def booleanOperation(self, targetBody, toolBody, booleanType):
+        self._count('booleanOperation')
+        # the real kernel intersects the tool with every face of the target, which is what makes
+        # growing accumulators expensive
+        touched = 0
+        for _, box in targetBody._shapes:
+            for _, toolBox in toolBody._shapes:
+                if box.intersects(toolBox):
+                    touched += 1
+        if booleanType == BooleanTypes.UnionBooleanType:
+            targetBody._shapes.extend((kind, box.copy()) for kind, box in toolBody._shapes)
+        elif booleanType == BooleanTypes.DifferenceBooleanType:
+            targetBody._shapes = [
+                shape for shape in targetBody._shapes
+                if not any(_sameBox(shape[1], box) for _, box in toolBody._shapes)
+            ]
+        return True
+
+
+def _sameBox(a, b):
+    return a.minPoint.isEqualTo(b.minPoint) and a.maxPoint.isEqualTo(b.maxPoint)
+
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+# Timeline ----------------------------------------------------------------------------------------------------------
+
+class TimelineObject(Base):
+    _classType = 'adsk::fusion::TimelineObject'
+
+    def __init__(self, timeline, entity):
+        self._timeline = timeline
+        self.entity = entity
+        self.name = getattr(entity, 'name', '')
+        self.isGroup = False
+        self.isSuppressed = False
+        self.parentGroup = None
+
+    @property
+    def index(self):
+        return self._timeline._objects.index(self)
+
+    @property
+    def isRolledBack(self):
+        return self.index >= self._timeline.markerPosition
+
+    def rollTo(self, rollBefore):
+        self._timeline.markerPosition = self.index if rollBefore else self.index + 1
+        return True
+
+
+class TimelineGroup(TimelineObject):
+    _classType = 'adsk::fusion::TimelineGroup'
+
+    def __init__(self, timeline, children):
+        super().__init__(timeline, None)
+        self.isGroup = True
+        self.isCollapsed = True
+        self._children = children
+        for child in children:
+            child.parentGroup = self
+
+    @property
+    def index(self):
+        return self._children[0].index
+
+    def __iter__(self):
+        return iter(list(self._children))
+
+    def __len__(self):
+        return len(self._children)
+
+    @property
+    def count(self):
+        return len(self._children)
+
+    def item(self, index):
+        return self._children[index]
+
+
+class TimelineGroups(Collection):
+    _classType = 'adsk::fusion::TimelineGroups'
+
+    def __init__(self, timeline):
+        super().__init__()
+        self._timeline = timeline
+
+    def add(self, startIndex, endIndex):
+        children = self._timeline._objects[startIndex:endIndex + 1]
+        group = TimelineGroup(self._timeline, children)
+        self._items.append(group)
+        return group
+
+
+class Timeline(Base):
+    _classType = 'adsk::fusion::Timeline'
+
+    def __init__(self, design):
+        self._design = design
+        self._objects: List[TimelineObject] = []
+        self._marker = 0
+        self.timelineGroups = TimelineGroups(self)
+        # number of features recomputed by marker moves, a proxy for the real recompute cost
+        self.recomputes = 0
+        self.markerMoves = 0
+
+    def _add(self, entity):
+        obj = TimelineObject(self, entity)
+        self._objects.insert(self._marker, obj)
+        self._marker += 1
+        return obj
+
+    @property
+    def markerPosition(self):
+        return self._marker
+
+    @markerPosition.setter
+    def markerPosition(self, value):
+        value = max(0, min(value, len(self._objects)))
+        self.markerMoves += 1
+        if value > self._marker:
+            self.recomputes += value - self._marker
+        self._marker = value
+
+    def moveToEnd(self):
+        self.markerPosition = len(self._objects)
+        return True
+
+    @property
+    def count(self):
+        return len(self._objects)
+
+    def item(self, index):
+        return self._objects[index]
+
+    def _topLevel(self):
+        items = []
+        for obj in self._objects:
+            item = obj.parentGroup if obj.parentGroup is not None else obj
+            if item not in items:
+                items.append(item)
+        return items
+
+    def __iter__(self):
+        return iter(self._topLevel())
+
+    def __len__(self):
+        return len(self._topLevel())
+
+
+# Features ----------------------------------------------------------------------------------------------------------
+
+class _Feature(_Entity):
+    def __init__(self, design, component, prefix):
+        super().__init__(design, prefix)
+        self.name = ''
+        self.parentComponent = component
+        self.timelineObject = design.timeline._add(self)
+        self.isSuppressed = False
+
+    def deleteMe(self):
+        self._design.timeline._objects.remove(self.timelineObject)
+        return True
+
+
+class BaseFeature(_Feature):
+    _classType = 'adsk::fusion::BaseFeature'
+
+    def __init__(self, design, component):
+        super().__init__(design, component, 'bf')
+        self._bodies: List[BRepBody] = []
+        self.isEditing = False
+        self.updates = 0
+
+    @property
+    def bodies(self):
+        return Collection(self._bodies)
+
+    def startEdit(self):
+        self.isEditing = True
+        return True
+
+    def finishEdit(self):
+        self.isEditing = False
+        # editing a base feature invalidates everything after it
+        timeline = self._design.timeline
+        timeline.recomputes += len(timeline._objects) - self.timelineObject.index
+        return True
+
+    def updateBody(self, body, newBody):
+        if not self.isEditing:
+            return False
+        body._shapes = [(kind, box.copy()) for kind, box in newBody._shapes]
+        self.updates += 1
+        return True
+
+
+class BaseFeatures(Collection):
+    _classType = 'adsk::fusion::BaseFeatures'
+
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def add(self):
+        feature = BaseFeature(self._component._design, self._component)
+        self._items.append(feature)
+        return feature
+
+
+class CombineFeatureInput(Base):
+    _classType = 'adsk::fusion::CombineFeatureInput'
+
+    def __init__(self, targetBody, toolBodies):
+        self.targetBody = targetBody
+        self.toolBodies = toolBodies
+        self.isKeepToolBodies = False
+        self.isNewComponent = False
+        self.operation = FeatureOperations.JoinFeatureOperation
+
+
+class CombineFeature(_Feature):
+    _classType = 'adsk::fusion::CombineFeature'
+
+    def __init__(self, design, component, input):
+        super().__init__(design, component, 'cf')
+        self.targetBody = input.targetBody
+        self.toolBodies = input.toolBodies
+        self.operation = input.operation
+
+
+class CombineFeatures(Collection):
+    _classType = 'adsk::fusion::CombineFeatures'
+
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def createInput(self, targetBody, toolBodies):
+        return CombineFeatureInput(targetBody, toolBodies)
+
+    def add(self, input):
+        feature = CombineFeature(self._component._design, self._component, input)
+        if not input.isKeepToolBodies:
+            for tool in input.toolBodies:
+                if tool in self._component.bRepBodies:
+                    self._component.bRepBodies._items.remove(tool)
+        self._items.append(feature)
+        return feature
+
+
+class Features(Base):
+    _classType = 'adsk::fusion::Features'
+
+    def __init__(self, component):
+        self.baseFeatures = BaseFeatures(component)
+        self.combineFeatures = CombineFeatures(component)
+
+
+class BRepBodies(Collection):
+    _classType = 'adsk::fusion::BRepBodies'
+
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def add(self, body, baseFeature=None):
+        design = self._component._design
+        added = BRepBody(design, self._component)
+        added._shapes = [(kind, box.copy()) for kind, box in body._shapes]
+        self._items.append(added)
+        if baseFeature is not None:
+            baseFeature._bodies.append(added)
+        return added
+
+
+class CustomGraphicsBRepBody(Base):
+    _classType = 'adsk::fusion::CustomGraphicsBRepBody'
+
+    def __init__(self, body):
+        self.body = body
+
+
+class CustomGraphicsGroup(Base):
+    _classType = 'adsk::fusion::CustomGraphicsGroup'
+
+    def __init__(self, groups):
+        self._groups = groups
+        self._graphics: List[CustomGraphicsBRepBody] = []
+
+    @property
+    def isValid(self):
+        return self in self._groups
+
+    @property
+    def count(self):
+        return len(self._graphics)
+
+    def addBRepBody(self, body):
+        graphics = CustomGraphicsBRepBody(body)
+        self._graphics.append(graphics)
+        return graphics
+
+    def deleteMe(self):
+        self._groups._items.remove(self)
+        return True
+
+
+class CustomGraphicsGroups(Collection):
+    _classType = 'adsk::fusion::CustomGraphicsGroups'
+
+    def add(self):
+        group = CustomGraphicsGroup(self)
+        self._items.append(group)
+        return group
+
+
+class Occurrence(_Entity):
+    _classType = 'adsk::fusion::Occurrence'
+
+    def __init__(self, design, component, transform):
+        super().__init__(design, 'o')
+        self.component = component
+        self.transform = transform
+        self.name = component.name
+
+
+class Occurrences(Collection):
+    _classType = 'adsk::fusion::Occurrences'
+
+    def __init__(self, component):
+        super().__init__()
+        self._component = component
+
+    def addExistingComponent(self, component, transform):
+        occurrence = Occurrence(self._component._design, component, transform)
+        self._items.append(occurrence)
+        return occurrence
+
+
+class Component(_Entity):
+    _classType = 'adsk::fusion::Component'
+
+    def __init__(self, design, name):
+        super().__init__(design, 'c')
+        self.name = name
+        self.parentDesign = design
+        self.features = Features(self)
+        self.bRepBodies = BRepBodies(self)
+        self.occurrences = Occurrences(self)
+        self.customGraphicsGroups = CustomGraphicsGroups()
+
+
+# Parameters --------------------------------------------------------------------------------------------------------
+
+class Parameter(_Entity):
+    _classType = 'adsk::fusion::Parameter'
+
+    def __init__(self, design, name, expression, unit, comment=''):
+        super().__init__(design, 'p')
+        self.name = name
+        self.expression = expression
+        self.unit = unit
+        self.comment = comment
+
+    @property
+    def value(self):
+        return self._design.unitsManager.evaluateExpression(self.expression, self.unit)
+
+    @value.setter
+    def value(self, value):
+        self.expression = '{} cm'.format(value)
+
+    @property
+    def dependentParameters(self):
+        return Collection([
+            parameter for parameter in self._design.allParameters
+            if parameter is not self and self.name in core.referencedNames(parameter.expression)
+        ])
+
+
+class UserParameter(Parameter):
+    _classType = 'adsk::fusion::UserParameter'
+
+
+class ModelParameter(Parameter):
+    _classType = 'adsk::fusion::ModelParameter'
+
+
+class Parameters(Collection):
+    _classType = 'adsk::fusion::ParameterList'
+    defaultUnits = 'mm'
+
+    def itemByName(self, name):
+        for parameter in self._items:
+            if parameter.name == name:
+                return parameter
+        return None
+
+
+class UserParameters(Parameters):
+    _classType = 'adsk::fusion::UserParameters'
+
+    def __init__(self, design):
+        super().__init__()
+        self._design = design
+
+    def add(self, name, value, units, comment):
+        expression = value.stringValue if value.stringValue is not None else '{} cm'.format(value.realValue)
+        parameter = UserParameter(self._design, name, expression, units, comment)
+        self._items.append(parameter)
+        return parameter
+
+
+# Design ------------------------------------------------------------------------------------------------------------
+
+class Design(_Entity):
+    _classType = 'adsk::fusion::Design'
+
+    def __init__(self):
+        self._entities: Dict[str, object] = {}
+        self._attributes: List[Attribute] = []
+        super().__init__(self, 'd')
+        self.unitsManager = core.UnitsManager(self)
+        self.timeline = Timeline(self)
+        self.userParameters = UserParameters(self)
+        self.modelParameters = Parameters()
+        self.rootComponent = Component(self, 'root')
+
+    def clear(self):
+        """stand-in only: removes all bodies, features, attributes and parameters"""
+        self._entities = {self.entityToken: self}
+        self._attributes = []
+        self._attributeCollection = None
+        self.unitsManager = core.UnitsManager(self)
+        self.timeline = Timeline(self)
+        self.userParameters = UserParameters(self)
+        self.modelParameters = Parameters()
+        self.rootComponent.__init__(self, 'root')
+
+    @property
+    def allParameters(self):
+        parameters = Parameters(list(self.userParameters) + list(self.modelParameters))
+        return parameters
+
+    def findEntityByToken(self, entityToken):
+        entity = self._entities.get(entityToken)
+        return [entity] if entity is not None else []
+
+    def findAttributes(self, groupName, attributeName):
+        return [
+            attribute for attribute in self._attributes
+            if attribute.groupName == groupName and (not attributeName or attribute.name == attributeName)
+        ]
@@ -0,0 +1,333 @@
+"""
+Headless benchmarks of the dogbone pipeline, run against the adsk stand-in in this directory.
+
+    python bench/benchmark.py
+    python bench/benchmark.py --sizes 1 4 16 64 256 --repeat 5 --part pockets
+
+Every benchmark runs on freshly generated parts with N pockets or mortises and reports the best
+time of all repetitions, together with the TemporaryBRepManager calls and timeline recomputes of
+the last one. The stand-in doesn't compute real geometry, the numbers show how the add-in scales
+with N, not how long Fusion takes. --check fails when a benchmark grows faster than --max-exponent
+between the two largest sizes, when the numpy and the pure Python corner classification differ, or when
+planning in worker processes fails or differs from planning serially.
+"""
+import argparse
+import importlib
+import importlib.util
+import math
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCH_PATH = os.path.dirname(os.path.abspath(__file__))
+ADDIN_PATH = os.path.dirname(BENCH_PATH)
+ADDIN_NAME = 'doge'
+
+# the stand-in has to shadow a real adsk package
+sys.path.insert(0, BENCH_PATH)
+
+import adsk.core  # noqa: E402
+import adsk.fusion  # noqa: E402
+
+import parts  # noqa: E402
+
+
+def loadAddIn():
+    """
+    imports the add-in as a package, the same way Fusion does, so its relative imports work
+    """
+    if ADDIN_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            ADDIN_NAME, os.path.join(ADDIN_PATH, '__init__.py'), submodule_search_locations=[ADDIN_PATH]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[ADDIN_NAME] = module
+        spec.loader.exec_module(module)
+
+    return SimpleNamespace(
+        geometry=importlib.import_module(ADDIN_NAME + '.geometry'),
+        options=importlib.import_module(ADDIN_NAME + '.options'),
+        classification=importlib.import_module(ADDIN_NAME + '.classification'),
+        parallel=importlib.import_module(ADDIN_NAME + '.parallel'),
+        planner=importlib.import_module(ADDIN_NAME + '.planner'),
+        doge=importlib.import_module(ADDIN_NAME + '.Doge'),
+    )
+
+
+PARTS = {
+    'pockets': parts.pocketPlate,
+    'mortises': lambda design, count: parts.pocketPlate(design, count, through=True),
+    'stepped': parts.steppedMortisePlate,
+    'split': lambda design, count: parts.pocketPlate(design, count, through=True, splitWalls=True),
+    # the size is the number of occurrences of one bracket
+    'occurrences': parts.occurrenceLayout,
+}
+
+TOOL_DIAMETER = 'tool_diameter'
+
+
+class Result(object):
+    def __init__(self, name: str, size: int, seconds: float, corners: int, calls: int, recomputes: int):
+        self.name = name
+        self.size = size
+        self.seconds = seconds
+        self.corners = corners
+        self.calls = calls
+        self.recomputes = recomputes
+
+
+class Benchmarks(object):
+    def __init__(self, addIn, partName: str):
+        self._addIn = addIn
+        self._createPart = PARTS[partName]
+
+    def _setUp(self, size: int):
+        design = adsk.core.Application.reset()
+        design.userParameters.add(TOOL_DIAMETER, adsk.core.ValueInput.createByString('3.175 mm'), 'mm', '')
+        self._addIn.options.expressionCache.invalidate()
+        part = self._createPart(design, size)
+        return design, part
+
+    def _input(self, part, featureGrouping: Optional[str] = None):
+        options = self._addIn.options
+        input = options.DogeboneFeatureInput(loadDefaults=False)
+        input.toolDiameter = options.FusionExpression(TOOL_DIAMETER)
+        input.faces = {face.entityToken: face for face in part.topFaces + part.bottomFaces}
+        if featureGrouping is not None:
+            input.featureGrouping = featureGrouping
+        return input
+
+    def _corners(self, faces) -> int:
+        geometry = self._addIn.geometry
+        snapshot = geometry.TopologySnapshot()
+        return sum(len(geometry.getDogboneEdgesForFace(face, snapshot)) for face in faces)
+
+    def _update(self, command):
+        args = SimpleNamespace(command=None)
+        command(args).onExecute(args)
+
+    # every benchmark prepares a design and returns the function to time, and the number of corners it handles
+
+    def edges(self, size: int) -> Tuple[Callable, int]:
+        design, part = self._setUp(size)
+        geometry = self._addIn.geometry
+        faces = part.topFaces + part.bottomFaces
+        corners = self._corners(faces)
+
+        def run():
+            # like the add-in, all faces share one snapshot of the body topology
+            snapshot = geometry.TopologySnapshot()
+            for face in faces:
+                geometry.getDogboneEdgesForFace(face, snapshot)
+
+        return run, corners
+
+    def detect(self, size: int) -> Tuple[Callable, int]:
+        """
+        Finds the faces with dogbone corners of the whole body, like selecting the body instead of its faces
+        """
+        design, part = self._setUp(size)
+        geometry = self._addIn.geometry
+        corners = self._corners(part.topFaces + part.bottomFaces)
+
+        return lambda: geometry.findDogboneFaces(part.body, (0.0, 0.0, 1.0)), corners
+
+    def toolBodies(self, size: int) -> Tuple[Callable, int]:
+        design, part = self._setUp(size)
+        geometry = self._addIn.geometry
+        input = self._input(part)
+        faces = list(input.faces.values())
+        corners = self._corners(faces)
+
+        def run():
+            snapshot = geometry.TopologySnapshot()
+            for face in faces:
+                geometry.createDogeBoneToolBody(face, input, snapshot)
+
+        return run, corners
+
+    def create(self, size: int, featureGrouping: Optional[str] = None) -> Tuple[Callable, int]:
+        design, part = self._setUp(size)
+        geometry = self._addIn.geometry
+        input = self._input(part, featureGrouping)
+        corners = self._corners(input.faces.values())
+
+        return lambda: geometry.createDogeBones(input), corners
+
+    def _created(self, size: int, featureGrouping: Optional[str] = None):
+        design, part = self._setUp(size)
+        geometry = self._addIn.geometry
+        input = self._input(part, featureGrouping)
+        corners = self._corners(input.faces.values())
+        geometry.createDogeBones(input)
+        return design, part, corners
+
+    def update(self, size: int, featureGrouping: Optional[str] = None) -> Tuple[Callable, int]:
+        """
+        Update after the tool diameter changed, every feature has to be rebuilt
+        """
+        design, _, corners = self._created(size, featureGrouping)
+        design.userParameters.itemByName(TOOL_DIAMETER).expression = '6 mm'
+
+        return lambda: self._update(self._addIn.doge.UpdateDogeCommand), corners
+
+    def updateUnchanged(self, size: int) -> Tuple[Callable, int]:
+        """
+        Update without any change, every feature can be skipped
+        """
+        design, _, corners = self._created(size)
+
+        return lambda: self._update(self._addIn.doge.UpdateDogeCommand), corners
+
+    def updateOnePocket(self, size: int, featureGrouping: Optional[str] = None) -> Tuple[Callable, int]:
+        """
+        Update after one pocket was widened, only its corners have to be rebuilt
+        """
+        design, part, corners = self._created(size, featureGrouping)
+        parts.widenFirstPocket(part)
+
+        return lambda: self._update(self._addIn.doge.UpdateDogeCommand), corners
+
+    # one feature per face, like every design made before the faces were grouped by body
+
+    def createPerFace(self, size: int) -> Tuple[Callable, int]:
+        return self.create(size, self._addIn.options.FeatureGrouping.FACE)
+
+    def updatePerFace(self, size: int) -> Tuple[Callable, int]:
+        return self.update(size, self._addIn.options.FeatureGrouping.FACE)
+
+    def updateOnePocketPerFace(self, size: int) -> Tuple[Callable, int]:
+        return self.updateOnePocket(size, self._addIn.options.FeatureGrouping.FACE)
+
+
+BENCHMARKS = [
+    'edges', 'detect', 'toolBodies', 'create', 'update', 'updateOnePocket', 'updateUnchanged',
+    'createPerFace', 'updatePerFace', 'updateOnePocketPerFace',
+]
+
+
+def measure(benchmarks: Benchmarks, name: str, size: int, repeat: int) -> Result:
+    best = math.inf
+    calls = recomputes = corners = 0
+    manager = adsk.fusion.TemporaryBRepManager.get()
+
+    for _ in range(repeat):
+        run, corners = getattr(benchmarks, name)(size)
+        timeline = adsk.core.Application.get().activeProduct.timeline
+        callsBefore = sum(manager.calls.values())
+        recomputesBefore = timeline.recomputes
+
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+        calls = sum(manager.calls.values()) - callsBefore
+        recomputes = timeline.recomputes - recomputesBefore
+
+    return Result(name, size, best, corners, calls, recomputes)
+
+
+def exponent(small: Result, large: Result) -> float:
+    """
+    growth of the run time with the number of corners, 1 is linear and 2 quadratic
+    """
+    if small.seconds <= 0 or large.corners <= small.corners:
+        return 0.0
+    return math.log(large.seconds / small.seconds) / math.log(large.corners / small.corners)
+
+
+def compareClassifiers(addIn, partName: str, sizes: List[int], tolerance=1e-9) -> List[str]:
+    """
+    classifies the corners of the parts with numpy and in pure Python, returns the differences
+    """
+    if addIn.classification.numpy is None:
+        print('numpy is not installed, the corner classifiers are not compared')
+        return []
+
+    failures = []
+    for size in sizes:
+        design = adsk.core.Application.reset()
+        part = PARTS[partName](design, size)
+        inputs = addIn.geometry.TopologySnapshot().topology(part.body).cornerInputs()
+        fast = addIn.classification.classifyCorners(*inputs)
+        slow = addIn.classification.classifyCorners(*inputs, useNumpy=False)
+        differences = sum(1 for a, b in zip(fast, slow) if abs(a - b) > tolerance)
+        if len(fast) != len(slow) or differences > 0:
+            failures.append(f"corner classification differs on {differences} of {len(slow)} edges with N={size}")
+    return failures
+
+
+def compareParallelPlanning(addIn, partName: str, size: int, workers=2) -> List[str]:
+    """
+    plans the faces of a part in the worker processes and serially, returns the differences. The faces are split
+    into one task per worker, failing to start or use the workers is a failure as well.
+    """
+    design = adsk.core.Application.reset()
+    part = PARTS[partName](design, size)
+    topology = addIn.geometry.TopologySnapshot().topology(part.body)
+    faces = list(range(len(topology.faceTokens)))
+    bodies = [(topology, faces[i::workers]) for i in range(workers)]
+    toolDiameter = 0.6
+    angleTolerance = adsk.core.Application.get().vectorAngleTolerance
+
+    pool = addIn.parallel.PlanningPool()
+    try:
+        parallel = pool.planInWorkers(bodies, toolDiameter, angleTolerance, workers)
+    except Exception as e:
+        return [f"parallel planning failed with N={size}: {e!r}"]
+    finally:
+        pool.shutdown()
+
+    serial = [addIn.planner.planBody(topology, faces, toolDiameter, angleTolerance) for topology, faces in bodies]
+    if [[plan.asJson() for plan in plans] for plans in parallel] != [[plan.asJson() for plan in plans] for plans in serial]:
+        return [f"parallel and serial planning differ with N={size}"]
+    return []
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks the dogbone pipeline on synthetic parts')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 16, 64], help='pockets per part')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--part', choices=sorted(PARTS.keys()), default='stepped')
+    parser.add_argument('--only', choices=BENCHMARKS, nargs='+', default=BENCHMARKS)
+    parser.add_argument('--check', action='store_true', help='fail when a benchmark scales worse than --max-exponent')
+    parser.add_argument('--max-exponent', type=float, default=1.5)
+    arguments = parser.parse_args(argv)
+
+    benchmarks = Benchmarks(loadAddIn(), arguments.part)
+    sizes = sorted(set(arguments.sizes))
+    failures = []
+
+    print(f"{'benchmark':<24}{'N':>6}{'corners':>9}{'seconds':>12}{'ms/corner':>11}{'brep calls':>12}{'recomputes':>12}")
+    for name in arguments.only:
+        results: Dict[int, Result] = {}
+        for size in sizes:
+            result = measure(benchmarks, name, size, arguments.repeat)
+            results[size] = result
+            perCorner = result.seconds * 1000 / result.corners if result.corners else 0.0
+            print(
+                f"{name:<24}{size:>6}{result.corners:>9}{result.seconds:>12.4f}{perCorner:>11.3f}"
+                f"{result.calls:>12}{result.recomputes:>12}"
+            )
+
+        if len(sizes) > 1:
+            growth = exponent(results[sizes[-2]], results[sizes[-1]])
+            print(f"{name:<24}{'':>6}{'':>9}  scaling exponent {growth:.2f}")
+            if growth > arguments.max_exponent:
+                failures.append(f"{name} scales with exponent {growth:.2f}")
+
+    if arguments.check:
+        failures.extend(compareClassifiers(benchmarks._addIn, arguments.part, sizes))
+        failures.extend(compareParallelPlanning(benchmarks._addIn, arguments.part, sizes[-1]))
+
+    if arguments.check and failures:
+        for failure in failures:
+            print('FAIL ' + failure)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,198 @@
+"""
+Synthetic parts for the benchmarks, built on the adsk stand-in.
+
+All dimensions are in cm, the plates lie in the XY plane with the pockets opening towards +Z.
+"""
+import math
+from typing import Dict, List, Sequence, Tuple
+
+import adsk.core
+import adsk.fusion
+
+Point = Tuple[float, float, float]
+Loop = Sequence[Point]
+
+
+class BodyBuilder(object):
+    """
+    builds a body from planar faces, each face given as loops of points. The outer loop runs
+    counterclockwise around the outward normal, inner loops clockwise.
+    """
+
+    def __init__(self, design: adsk.fusion.Design, component: adsk.fusion.Component, name: str):
+        self._design = design
+        self.body = adsk.fusion.BRepBody(design, component)
+        self.body.name = name
+        self._vertices: Dict[Point, adsk.fusion.BRepVertex] = {}
+        self._edges: Dict[Tuple[int, int], adsk.fusion.BRepEdge] = {}
+
+    def _vertex(self, point: Point) -> adsk.fusion.BRepVertex:
+        key = tuple(round(c, 9) for c in point)
+        vertex = self._vertices.get(key)
+        if vertex is None:
+            vertex = adsk.fusion.BRepVertex(self._design, self.body, adsk.core.Point3D.create(*point))
+            self._vertices[key] = vertex
+            self.body._vertices.append(vertex)
+        return vertex
+
+    def addFace(self, loops: Sequence[Loop]):
+        normal = _newellNormal(loops[0])
+        face = adsk.fusion.BRepFace(self._design, self.body, adsk.core.Vector3D.create(*normal), adsk.core.Point3D.create(*loops[0][0]))
+        for loopIndex, points in enumerate(loops):
+            loop = adsk.fusion.BRepLoop(face, loopIndex == 0)
+            vertices = [self._vertex(point) for point in points]
+            for start, end in zip(vertices, vertices[1:] + vertices[:1]):
+                key = (min(id(start), id(end)), max(id(start), id(end)))
+                edge = self._edges.get(key)
+                if edge is None:
+                    edge = adsk.fusion.BRepEdge(self._design, self.body, start, end)
+                    self._edges[key] = edge
+                    self.body._edges.append(edge)
+                coEdge = adsk.fusion.BRepCoEdge(edge, loop, edge.startVertex is not start)
+                edge._coEdges.append(coEdge)
+                loop._coEdges.append(coEdge)
+            face._loops.append(loop)
+        self.body._faces.append(face)
+        return face
+
+    def addWalls(self, ring: Loop, bottom: float, top: float):
+        """
+        adds the vertical faces below a ring of points at height top, the ring is given in the
+        orientation it has in the face at the top
+        """
+        faces = []
+        for (x0, y0, _), (x1, y1, _) in zip(ring, list(ring[1:]) + list(ring[:1])):
+            faces.append(self.addFace([[(x0, y0, bottom), (x1, y1, bottom), (x1, y1, top), (x0, y0, top)]]))
+        return faces
+
+    def finish(self, component: adsk.fusion.Component) -> adsk.fusion.BRepBody:
+        component.bRepBodies._items.append(self.body)
+        return self.body
+
+
+def _newellNormal(points: Loop) -> Point:
+    nx = ny = nz = 0.0
+    for (x0, y0, z0), (x1, y1, z1) in zip(points, list(points[1:]) + list(points[:1])):
+        nx += (y0 - y1) * (z0 + z1)
+        ny += (z0 - z1) * (x0 + x1)
+        nz += (x0 - x1) * (y0 + y1)
+    length = math.sqrt(nx * nx + ny * ny + nz * nz)
+    return nx / length, ny / length, nz / length
+
+
+def rect(x0: float, y0: float, x1: float, y1: float, z: float, clockwise=False) -> List[Point]:
+    """rectangle counterclockwise around +Z"""
+    points = [(x0, y0, z), (x1, y0, z), (x1, y1, z), (x0, y1, z)]
+    return points[::-1] if clockwise else points
+
+
+def _grid(count: int, pitch: float) -> List[Tuple[float, float]]:
+    columns = max(1, int(math.ceil(math.sqrt(count))))
+    return [((i % columns) * pitch, (i // columns) * pitch) for i in range(count)]
+
+
+class Part(object):
+    def __init__(self, body: adsk.fusion.BRepBody, topFaces: List[adsk.fusion.BRepFace], bottomFaces: List[adsk.fusion.BRepFace]):
+        self.body = body
+        # faces facing +Z / -Z whose corners need dogbones
+        self.topFaces = topFaces
+        self.bottomFaces = bottomFaces
+
+
+def widenFirstPocket(part: Part, by=0.2, size=2.0, gap=1.0):
+    """
+    moves the +X side of the first pocket (or mortise) of a plate, only the corners of that side change
+    """
+    side = gap + size
+    for vertex in part.body.vertices:
+        point = vertex._point
+        if abs(point.x - side) < 1e-9 and gap - 1e-9 <= point.y <= side + 1e-9:
+            point.x += by
+
+
+def pocketPlate(
+    design: adsk.fusion.Design, pockets: int, size=2.0, gap=1.0, thickness=1.8, depth=1.0, through=False, splitWalls=False,
+    component: adsk.fusion.Component = None
+) -> Part:
+    """
+    plate with a grid of rectangular pockets, with through=True the pockets are mortises through the plate.
+    With splitWalls=True every wall of a pocket consists of two faces, one above the other, so each corner
+    is split into two collinear edges. The plate is built in the root component unless another one is given.
+    """
+    component = component or design.rootComponent
+    builder = BodyBuilder(design, component, 'plate')
+    pitch = size + gap
+    cells = _grid(pockets, pitch)
+    width = max(x for x, _ in cells) + pitch + gap
+    height = max(y for _, y in cells) + pitch + gap
+    floor = 0.0 if through else thickness - depth
+
+    rims = [rect(gap + x, gap + y, gap + x + size, gap + y + size, thickness, clockwise=True) for x, y in cells]
+
+    top = builder.addFace([rect(0, 0, width, height, thickness)] + rims)
+    builder.addWalls(rect(0, 0, width, height, thickness), 0, thickness)
+
+    bottomLoops = [rect(0, 0, width, height, 0, clockwise=True)]
+    for rim in rims:
+        if splitWalls:
+            middle = (floor + thickness) / 2
+            builder.addWalls(rim, floor, middle)
+            builder.addWalls(rim, middle, thickness)
+        else:
+            builder.addWalls(rim, floor, thickness)
+        if through:
+            bottomLoops.append([(x, y, 0) for x, y, _ in reversed(rim)])
+        else:
+            builder.addFace([[(x, y, floor) for x, y, _ in reversed(rim)]])
+    bottom = builder.addFace(bottomLoops)
+
+    return Part(builder.finish(component), [top], [bottom] if through else [])
+
+
+def occurrenceLayout(design: adsk.fusion.Design, occurrences: int, mortises=4, pitch=12.0) -> Part:
+    """
+    sheet layout with a grid of occurrences of one bracket component, a plate with mortises. The faces
+    of the part are the proxies of the bracket faces in every occurrence, its body is the native body.
+    """
+    bracket = adsk.fusion.Component(design, 'bracket')
+    part = pocketPlate(design, mortises, through=True, component=bracket)
+
+    topFaces: List[adsk.fusion.BRepFace] = []
+    bottomFaces: List[adsk.fusion.BRepFace] = []
+    for x, y in _grid(occurrences, pitch):
+        transform = adsk.core.Matrix3D.create()
+        transform.translation = adsk.core.Vector3D.create(x, y, 0)
+        occurrence = design.rootComponent.occurrences.addExistingComponent(bracket, transform)
+        topFaces.extend(face.createForAssemblyContext(occurrence) for face in part.topFaces)
+        bottomFaces.extend(face.createForAssemblyContext(occurrence) for face in part.bottomFaces)
+
+    return Part(part.body, topFaces, bottomFaces)
+
+
+def steppedMortisePlate(design: adsk.fusion.Design, mortises: int, size=2.0, step=0.4, gap=1.0, thickness=1.8, depth=0.8) -> Part:
+    """
+    plate with stepped mortises, a wide pocket of the given depth and a narrower mortise through the rest of the plate
+    """
+    component = design.rootComponent
+    builder = BodyBuilder(design, component, 'stepped')
+    pitch = size + gap
+    cells = _grid(mortises, pitch)
+    width = max(x for x, _ in cells) + pitch + gap
+    height = max(y for _, y in cells) + pitch + gap
+    ledge = thickness - depth
+
+    upperRims = [rect(gap + x, gap + y, gap + x + size, gap + y + size, thickness, clockwise=True) for x, y in cells]
+    lowerRims = [rect(gap + x + step, gap + y + step, gap + x + size - step, gap + y + size - step, ledge, clockwise=True) for x, y in cells]
+
+    top = builder.addFace([rect(0, 0, width, height, thickness)] + upperRims)
+    builder.addWalls(rect(0, 0, width, height, thickness), 0, thickness)
+
+    ledges = []
+    for upper, lower in zip(upperRims, lowerRims):
+        builder.addWalls(upper, ledge, thickness)
+        ledges.append(builder.addFace([[(x, y, ledge) for x, y, _ in reversed(upper)], lower]))
+        builder.addWalls(lower, 0, ledge)
+
+    bottom = builder.addFace([rect(0, 0, width, height, 0, clockwise=True)] + [[(x, y, 0) for x, y, _ in reversed(lower)] for lower in lowerRims])
+
+    return Part(builder.finish(component), [top] + ledges, [bottom])
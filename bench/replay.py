@@ -0,0 +1,41 @@
+"""
+Replays traces recorded with DOGE_TRACE against the current add-in code, no Fusion needed.
+
+    python bench/replay.py doge-update-20240101-120000-000.trace.gz --repeat 5
+
+Set DOGE_TRACE to a directory before starting Fusion to record the creates and updates of a design.
+A replay fails with a ReplayError as soon as the add-in makes a call that isn't in the trace.
+"""
+import argparse
+import importlib
+import sys
+import time
+from typing import List
+
+import benchmark
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Replays recorded create and update traces')
+    parser.add_argument('traces', nargs='+')
+    parser.add_argument('--repeat', type=int, default=1)
+    arguments = parser.parse_args(argv)
+
+    benchmark.loadAddIn()
+    recording = importlib.import_module(benchmark.ADDIN_NAME + '.recording')
+
+    print(f"{'trace':<48}{'operations':>12}{'calls':>10}{'seconds':>12}")
+    for path in arguments.traces:
+        best = float('inf')
+        replayer = None
+        for _ in range(arguments.repeat):
+            replayer = recording.Replayer(path)
+            start = time.perf_counter()
+            replayer.run()
+            best = min(best, time.perf_counter() - start)
+        print(f"{path[-48:]:<48}{len(replayer.operations):>12}{replayer.replayed:>10}{best:>12.4f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,99 @@
+import math
+from typing import List, Sequence, Tuple
+
+from . import vecmath
+
+# Fusion's bundled interpreter doesn't ship numpy, the pure Python path gives the same results.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Batch classification of corner edges. Vectors and normals are passed as flat
+# sequences with three components per edge, like the tables of a BodyTopology.
+
+
+def _vector(values: Sequence[float], index: int) -> vecmath.Vector:
+    i = index * 3
+    return values[i], values[i + 1], values[i + 2]
+
+
+def classifyCorners(
+    edgeVectors: Sequence[float], opposed: Sequence[int], normals1: Sequence[float], normals2: Sequence[float], valid: Sequence[int],
+    useNumpy=True
+) -> List[float]:
+    """
+    returns the radian corner angle of every edge, concave corners are below pi.
+
+    edgeVectors run from the start to the end of the edge, opposed tells whether the co-edge
+    of face1 runs against the edge. Edges that aren't valid get an angle of 0. With useNumpy=False
+    the pure Python path is taken even if numpy is available.
+    """
+    if useNumpy and numpy is not None and len(opposed) > 0:
+        return _classifyCornersNumpy(edgeVectors, opposed, normals1, normals2, valid)
+
+    angles: List[float] = []
+    for edge in range(len(opposed)):
+        if not valid[edge]:
+            angles.append(0.0)
+            continue
+
+        edgeVector = _vector(edgeVectors, edge)
+        if opposed[edge]:
+            edgeVector = vecmath.scale(edgeVector, -1)
+
+        normal1, normal2 = _vector(normals1, edge), _vector(normals2, edge)
+        normalAngle = vecmath.angleTo(normal1, normal2)
+        cross = vecmath.cross(normal2, normal1)
+
+        if vecmath.angleTo(edgeVector, cross) > math.pi / 2:
+            angles.append((math.pi * 2) - (math.pi - normalAngle))
+        else:
+            angles.append(math.pi - normalAngle)
+
+    return angles
+
+
+def _angles(a, b):
+    norms = numpy.sqrt(numpy.einsum('ij,ij->i', a, a)) * numpy.sqrt(numpy.einsum('ij,ij->i', b, b))
+    zero = norms == 0
+    cosines = numpy.einsum('ij,ij->i', a, b) / numpy.where(zero, 1.0, norms)
+    return numpy.where(zero, 0.0, numpy.arccos(numpy.clip(cosines, -1.0, 1.0)))
+
+
+def _classifyCornersNumpy(edgeVectors, opposed, normals1, normals2, valid):
+    edgeVectors = numpy.asarray(edgeVectors, dtype=float).reshape(-1, 3)
+    normals1 = numpy.asarray(normals1, dtype=float).reshape(-1, 3)
+    normals2 = numpy.asarray(normals2, dtype=float).reshape(-1, 3)
+    opposed = numpy.asarray(opposed, dtype=bool)
+    valid = numpy.asarray(valid, dtype=bool)
+
+    oriented = numpy.where(opposed[:, None], -edgeVectors, edgeVectors)
+    normalAngles = _angles(normals1, normals2)
+    convex = _angles(oriented, numpy.cross(normals2, normals1)) > math.pi / 2
+
+    angles = numpy.where(convex, (math.pi * 2) - (math.pi - normalAngles), math.pi - normalAngles)
+    angles = numpy.where(valid, angles, 0.0)
+
+    return angles.tolist()
+
+
+def parallelToNormal(directions: Sequence[float], normal: vecmath.Vector, angleTolerance: float) -> Tuple[List[bool], List[bool]]:
+    """
+    returns for every direction whether it's parallel to the normal, and whether it points the same way
+    """
+    count = len(directions) // 3
+    if numpy is not None and count > 0:
+        directions = numpy.asarray(directions, dtype=float).reshape(-1, 3)
+        angles = _angles(directions, numpy.broadcast_to(numpy.asarray(normal, dtype=float), directions.shape))
+        codirectional = angles <= angleTolerance
+        parallel = codirectional | (math.pi - angles <= angleTolerance)
+        return parallel.tolist(), codirectional.tolist()
+
+    parallel: List[bool] = []
+    codirectional: List[bool] = []
+    for index in range(count):
+        angle = vecmath.angleTo(_vector(directions, index), normal)
+        codirectional.append(angle <= angleTolerance)
+        parallel.append(angle <= angleTolerance or math.pi - angle <= angleTolerance)
+    return parallel, codirectional
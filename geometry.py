@@ -1,14 +1,37 @@
-import math
-from typing import cast, List, Union, Optional
+import hashlib
+import json
+import logging
+from typing import cast, Dict, List, Set, Tuple, Union, Optional
 
+from .analysis import FaceAnalysisCache
 from .log import logger
-from .options import DogeboneFeatureInput
+from .options import DogeboneFeatureInput, FeatureGrouping, UnionStrategy
+from .parameters import ParameterIndex, changedParameters, readParameterValues
+from .parallel import planningPool
+from . import vecmath
+from .planner import (
+    CornerPatch, CornerPlan, CornerRegistry, DogbonePlan, diffCorners, isRecord, mergePlans, recordCovers,
+    replanCorner
+)
+from .profiling import profiler
+from .scheduler import UpdateScheduler
+from .toolcache import templateKey, toolBodyCache
+from .topology import BodyTopology
+from .vecmath import Vector
 
 import adsk.core
 import adsk.fusion
 
 FACE = 'face'
+FACES = 'faces'
 INPUT = 'input'
+FINGERPRINT = 'fingerprint'
+FACE_STATE = 'faceState'
+PARAMETERS = 'parameters'
+CORNERS = 'corners'
+SHARED = 'shared'
+
+FINGERPRINT_SEPARATOR = ':'
 
 GROUP_NAME = 'doge'
 
@@ -25,235 +48,357 @@ def native(obj: Union[adsk.fusion.BRepFace, adsk.fusion.BRepEdge]):
     return obj.nativeObject if obj.nativeObject else obj
 
 
-def getEdgeVector(
-    edge: adsk.fusion.BRepEdge, refFace: adsk.fusion.BRepFace = None, reverse=False
-) -> adsk.core.Vector3D:
-    """
-    returns vector of the edge parameter (not normalised!)
-    if refFace is supplied - returns vector pointing out from face vertex"""
-    if refFace:
-        reverse = edge.endVertex in refFace.vertices
-    startPoint, endPoint = (
-        (edge.endVertex.geometry, edge.startVertex.geometry)
-        if reverse
-        else (edge.startVertex.geometry, edge.endVertex.geometry)
-    )
-    return startPoint.vectorTo(endPoint)
+def getPointTuple(point: adsk.core.Point3D):
+    return point.x, point.y, point.z
 
 
-def getAngleBetweenFaces(edge: adsk.fusion.BRepEdge) -> float:
+class TopologyReader(object):
     """
-    returns radian angle between faces
+    Reads faces, edges and vertices of a body from the live B-Rep into a BodyTopology, every entity is read once.
+    The edges are kept alive, indexed like the topology's edge table.
     """
 
+    def __init__(self, body: adsk.fusion.BRepBody):
+        self.topology = BodyTopology(body.entityToken)
+        self.edges: List[adsk.fusion.BRepEdge] = []
+        self._planeType = adsk.core.Plane.classType()
+        self._lineType = adsk.core.Curve3DTypes.Line3DCurveType
+
+    def addFace(self, face: adsk.fusion.BRepFace) -> int:
+        faceIndex = self.topology.faceIndex.get(face.entityToken)
+        if faceIndex is not None:
+            return faceIndex
+
+        isPlanar = face.geometry.objectType == self._planeType
+        normal = getPointTuple(getFaceNormal(face)) if isPlanar else None
+        return self.topology.addFace(face.entityToken, isPlanar, normal)
+
+    def addVertex(self, vertex: adsk.fusion.BRepVertex) -> int:
+        vertexIndex = self.topology.vertexIndex.get(vertex.entityToken)
+        if vertexIndex is not None:
+            return vertexIndex
+        return self.topology.addVertex(vertex.entityToken, getPointTuple(vertex.geometry))
+
+    def addEdge(self, edge: adsk.fusion.BRepEdge) -> int:
+        edgeIndex = self.topology.edgeIndex.get(edge.entityToken)
+        if edgeIndex is not None:
+            return edgeIndex
+
+        isLine = edge.isValid and not edge.isDegenerate and edge.geometry.curveType == self._lineType
+        edgeIndex = self.topology.addEdge(edge.entityToken, isLine, self.addVertex(edge.startVertex), self.addVertex(edge.endVertex))
+        self.edges.append(edge)
+        return edgeIndex
+
+    def addNeighbourhood(self, face: adsk.fusion.BRepFace):
+        """
+        adds the face, the edges of the face and at its vertices, and the faces of these edges
+        """
+        self.addFace(face)
+        edges = list(face.edges) + [edge for vertex in face.vertices for edge in vertex.edges]
+        for edge in edges:
+            if edge.entityToken in self.topology.edgeIndex:
+                continue
+            edgeIndex = self.addEdge(edge)
+            for coEdge in edge.coEdges:
+                self.topology.addCoEdge(edgeIndex, self.addFace(coEdge.loop.face), coEdge.isOpposedToEdge)
+
+    def finish(self) -> Tuple[BodyTopology, List[adsk.fusion.BRepEdge]]:
+        self.topology.finish()
+        return self.topology, self.edges
+
+
+def snapshotBody(body: adsk.fusion.BRepBody) -> Tuple[BodyTopology, List[adsk.fusion.BRepEdge]]:
     """
-    Steps:
-    get both adjacent faces of the edge
-    crossProduct of these face Normals will point up or down
-    to determine which is up compare direction with edge
-    but: the edge direction needs to be determined 
-    outer coEdges always run counterClockwise
-    get the coEdge for face1
-    orient the edge vector so it is has the same direction as the coEdge.
-    
-    Then with edge vertical, face1 on left, face2 on right, coEdge1 will be up
-    if inside corner: face1normal x face2normal result will be in DOWN direction
-    ie opposite to face1 coEdge direction
+    reads faces, edges, vertices, plane normals and the adjacency of a body into a BodyTopology.
+    returns the topology and the live edges, indexed like the topology's edge table
     """
-    # Verify that the two faces are planar.
-    face1, face2 = (face for face in edge.faces)
+    reader = TopologyReader(body)
+    for face in body.faces:
+        faceIndex = reader.addFace(face)
+        for loop in face.loops:
+            for coEdge in loop.coEdges:
+                reader.topology.addCoEdge(reader.addEdge(coEdge.edge), faceIndex, coEdge.isOpposedToEdge)
+    return reader.finish()
 
-    if not face1 or not face2:
-        return 0
 
-    if face1.geometry.objectType != adsk.core.Plane.classType() or face2.geometry.objectType != adsk.core.Plane.classType():
-        return 0
+class TopologySnapshot(object):
+    """
+    Keeps the topology of every body touched during one operation, keyed by the native body entityToken.
+    The snapshot is only valid as long as the design isn't modified, e.g. by a timeline roll.
+    """
 
-    # Get the normal of each face.
-    _, normal1 = face1.evaluator.getNormalAtPoint(face1.pointOnFace)
-    _, normal2 = face2.evaluator.getNormalAtPoint(face2.pointOnFace)
-    # Get the angle between the normals.
-    normalAngle = normal1.angleTo(normal2)
+    def __init__(self):
+        self._topologies: Dict[str, BodyTopology] = {}
+        self._edges: Dict[str, List[adsk.fusion.BRepEdge]] = {}
 
-    # Get the co-edge of the selected edge for face1.
-    coEdge1, coEdge2 = (coEdge for coEdge in edge.coEdges)
-    coEdge = coEdge1 if coEdge1.loop.face == face1 else coEdge2
+    def topology(self, body: adsk.fusion.BRepBody) -> BodyTopology:
+        body = native(body)
+        token = body.entityToken
+        topology = self._topologies.get(token)
+        if topology is None:
+            topology, edges = snapshotBody(body)
+            self._topologies[token] = topology
+            self._edges[token] = edges
+        return topology
 
-    # Create a vector that represents the direction of the co-edge.
-    edgeVec = getEdgeVector(edge, reverse=coEdge.isOpposedToEdge)
+    def edge(self, topology: BodyTopology, index: int) -> adsk.fusion.BRepEdge:
+        return self._edges[topology.bodyToken][index]
 
-    # Get the cross product of the face normals.
-    # normal1 and normal2 are flipped as edge vector is pointing "up"
-    cross = normal2.crossProduct(normal1)
 
-    # Check to see if the cross product is in the same or opposite direction
-    # of the co-edge direction.  If it's opposed then it's a convex angle.
-    angle = (
-        (math.pi * 2) - (math.pi - normalAngle)
-        if edgeVec.angleTo(cross) > math.pi / 2
-        else math.pi - normalAngle
-    )
+class FaceSnapshot(TopologySnapshot):
+    """
+    A snapshot of the surroundings of the given faces only: the faces, the edges at their vertices and the faces
+    of these edges. That's everything the planning, the fingerprint and the face state read, so the faces of a
+    single feature are read without the rest of their bodies. The other faces in the snapshot are incomplete,
+    only the given faces can be looked up.
+    """
+
+    def __init__(self, faces: List[adsk.fusion.BRepFace]):
+        super().__init__()
+        readers: Dict[str, TopologyReader] = {}
+        for face in faces:
+            face = native(face)
+            body = face.body
+            reader = readers.get(body.entityToken)
+            if reader is None:
+                reader = readers[body.entityToken] = TopologyReader(body)
+            reader.addNeighbourhood(face)
+
+        for token, reader in readers.items():
+            self._topologies[token], self._edges[token] = reader.finish()
+
 
-    return angle
+def createCornerBody(corner: CornerPlan) -> adsk.fusion.BRepBody:
+    """
+    creates the temporary tool body of a planned corner, a copy of the cached canonical body
+    with the same radius, length and angle, moved onto the axis of the corner
+    """
+    tempBrepMgr = adsk.fusion.TemporaryBRepManager.get()
 
+    axis = vecmath.subtract(corner.end, corner.start)
+    length = vecmath.length(axis)
+    zAxis = vecmath.normalize(axis)
+    if corner.clearance is None:
+        # a cylinder looks the same from every side
+        xAxis = perpendicular(zAxis)
+        key = templateKey(corner.radius, length, None)
+    else:
+        # the clearance box lies along the corner vector
+        xAxis = vecmath.normalize(vecmath.subtract(corner.corner, vecmath.scale(zAxis, vecmath.dot(corner.corner, zAxis))))
+        key = templateKey(corner.radius, length, corner.angle)
+    yAxis = vecmath.cross(zAxis, xAxis)
+
+    template = toolBodyCache.get(key, lambda: createTemplateBody(corner, length, (xAxis, yAxis, zAxis)))
+    with profiler.call('copy'):
+        toolBody = tempBrepMgr.copy(template)
+
+    transform = adsk.core.Matrix3D.create()
+    transform.setWithCoordinateSystem(
+        adsk.core.Point3D.create(*corner.start),
+        adsk.core.Vector3D.create(*xAxis),
+        adsk.core.Vector3D.create(*yAxis),
+        adsk.core.Vector3D.create(*zAxis)
+    )
+    with profiler.call('transform'):
+        tempBrepMgr.transform(toolBody, transform)
 
-def getCornerVector(edge: adsk.fusion.BRepEdge) -> adsk.core.Vector3D:
-    face1, face2 = (face for face in native(edge).faces)
+    return toolBody
 
-    _, face1normal = face1.evaluator.getNormalAtPoint(face1.pointOnFace)
-    _, face2normal = face2.evaluator.getNormalAtPoint(face2.pointOnFace)
-    face1normal.add(face2normal)
-    face1normal.normalize()
 
-    return face1normal
+def perpendicular(direction: Vector) -> Vector:
+    """
+    returns a unit vector perpendicular to the direction, built from the coordinate axis least aligned with it
+    """
+    axis = min(range(3), key=lambda i: abs(direction[i]))
+    return vecmath.normalize(vecmath.cross(tuple(1.0 if i == axis else 0.0 for i in range(3)), direction))
 
 
-def getToolBody(edge: adsk.fusion.BRepEdge, face: adsk.fusion.BRepFace, inputs: DogeboneFeatureInput, topFace: adsk.fusion.BRepFace = None) -> adsk.fusion.BRepBody:
+def createTemplateBody(corner: CornerPlan, length: float, frame: Tuple[Vector, Vector, Vector]) -> adsk.fusion.BRepBody:
+    """
+    creates the tool body of the corner in its own coordinate system: the axis runs from the origin along z,
+    the clearance box lies along x. frame are the axes of that coordinate system in model space.
+    """
     tempBrepMgr = adsk.fusion.TemporaryBRepManager.get()
 
-    faceNative = native(face)
-    edgeNative = native(edge)
+    def local(vector: Vector) -> Vector:
+        return tuple(vecmath.dot(vector, axis) for axis in frame)
 
-    nativeEndPoints = (
-        (edgeNative.startVertex.geometry, edgeNative.endVertex.geometry)
-        if edgeNative.startVertex in faceNative.vertices
-        else (edgeNative.endVertex.geometry, edgeNative.startVertex.geometry)
-    )
+    with profiler.call('createCylinderOrCone'):
+        toolBody = tempBrepMgr.createCylinderOrCone(
+            adsk.core.Point3D.create(0, 0, length), corner.radius, adsk.core.Point3D.create(0, 0, 0), corner.radius
+        )
 
-    startPoint, endPoint = nativeEndPoints
+    clearance = corner.clearance
+    if clearance is None:
+        return toolBody
 
-    startPoint, endPoint = startPoint.copy(), endPoint.copy()
+    boundaryBox = adsk.core.OrientedBoundingBox3D.create(
+        adsk.core.Point3D.create(*local(vecmath.subtract(clearance.centre, corner.start))),
+        adsk.core.Vector3D.create(*local(clearance.lengthDirection)),
+        adsk.core.Vector3D.create(*local(clearance.widthDirection)),
+        clearance.length,
+        clearance.width,
+        clearance.height
+    )
+    with profiler.call('createBox'):
+        box = tempBrepMgr.createBox(boundaryBox)
+    with profiler.call('booleanOperation'):
+        tempBrepMgr.booleanOperation(toolBody, box, adsk.fusion.BooleanTypes.UnionBooleanType)
 
-    # offset = params.toolDiaOffset
-    # TODO: where does the offset come from
-    offset = 0
-    effectiveRadius = (inputs.toolDiameter.value + offset) / 2
-    # centreDistance = effectiveRadius * (
-    #     (1 + params.minimalPercent / 100)
-    #     if params.dbType == "Minimal Dogbone"
-    #     else 1
-    # )
-    centreDistance = effectiveRadius
+    return toolBody
 
-    # if topFace:
-    #     translateVector = dbUtils.getTranslateVectorBetweenFaces(
-    #         edgeObj._parentFace.face, topFace
-    #     )
-    #     startPoint.translateBy(translateVector)
 
-    dirVect = getCornerVector(edge).copy()
-    dirVect.normalize()
+def executePlan(plan: DogbonePlan, strategy: str) -> List[adsk.fusion.BRepBody]:
+    """
+    creates the tool bodies of all corners of the plan and unions them according to the strategy
+    """
+    return [toolBody for toolBody, _ in buildToolBodies(plan.corners, strategy)]
 
-    dirVect.scaleBy(centreDistance)
-    startPoint.translateBy(dirVect)
-    endPoint.translateBy(dirVect)
 
-    toolBody = tempBrepMgr.createCylinderOrCone(
-        endPoint, effectiveRadius, startPoint, effectiveRadius
-    )
+def buildToolBodies(corners: List[CornerPlan], strategy: str) -> List[Tuple[adsk.fusion.BRepBody, List[CornerPlan]]]:
+    """
+    creates the tool bodies of the corners and unions them according to the strategy, every
+    resulting body is returned with the corners it's made of
+    """
+    with profiler.stage('toolBodies'):
+        toolBodies = [createCornerBody(corner) for corner in corners]
 
-    cornerAngle = getAngleBetweenFaces(edge)
-    if cornerAngle >= math.pi / 2:
-        return toolBody
+    with profiler.stage('union'):
+        return [
+            (reduceToolBodies([toolBodies[i] for i in group], balanced=strategy != UnionStrategy.SEQUENTIAL), [corners[i] for i in group])
+            for group in groupToolBodies(toolBodies, strategy)
+        ]
 
-    # creating a box that will be used to clear the path the tool takes to the dogbone hole
-    # box width is toolDia
-    # box height is same as edge length
-    # box length is from the hole centre to the point where the tool meets the sides
-
-    raise Exception('Not implemented')
-    # edgeHeight = startPoint.distanceTo(endPoint)
-    #
-    # logger.debug("Adding acute angle clearance box")
-    # cornerTan = math.tan(edgeObj.cornerAngle / 2)
-    #
-    # boxCentrePoint = startPoint.copy()
-    # boxLength = effectiveRadius / cornerTan - centreDistance
-    # boxWidth = effectiveRadius * 2
-    #
-    # lengthDirectionVector = edgeObj.cornerVector.copy()
-    # lengthDirectionVector.normalize()
-    # lengthDirectionVector.scaleBy(boxLength / 2)
-    #
-    # if lengthDirectionVector.length < 0.01:
-    #     return toolBody
-    #
-    # heightDirectionVector = edgeObj.edgeVector.copy()
-    # heightDirectionVector.normalize()
-    # heightDirectionVector.scaleBy(edgeHeight / 2)
-    #
-    # heightDirectionVector.add(lengthDirectionVector)
-    #
-    # lengthDirectionVector.normalize()
-    #
-    # boxCentrePoint.translateBy(heightDirectionVector)
-    #
-    # #   rotate centreLine Vector (cornerVector) by 90deg to get width direction vector
-    # orthogonalMatrix = adsk.core.Matrix3D.create()
-    # orthogonalMatrix.setToRotation(math.pi / 2, edgeObj.edgeVector, boxCentrePoint)
-    #
-    # widthDirectionVector = edgeObj.cornerVector.copy()
-    # widthDirectionVector.transformBy(orthogonalMatrix)
-    #
-    # boxLength = 0.001 if (boxLength < 0.001) else boxLength
-    #
-    # boundaryBox = adsk.core.OrientedBoundingBox3D.create(
-    #     centerPoint=boxCentrePoint,
-    #     lengthDirection=lengthDirectionVector,
-    #     widthDirection=widthDirectionVector,
-    #     length=boxLength,
-    #     width=boxWidth,
-    #     height=edgeHeight,
-    # )
-    #
-    # box = tempBrepMgr.createBox(boundaryBox)
-    #
-    # tempBrepMgr.booleanOperation(
-    #     targetBody=toolBody,
-    #     toolBody=box,
-    #     booleanType=adsk.fusion.BooleanTypes.UnionBooleanType,
-    # )
-    #
-    # return toolBody
-
-
-def createDogeBones(inputs: DogeboneFeatureInput):
+
+def createDogeBones(inputs: DogeboneFeatureInput, analysis: Optional[FaceAnalysisCache] = None):
+    """
+    creates the dogbone features of the selected faces, the plans of faces analysed while they were
+    selected are taken from the analysis
+    """
     logger.info("Creating dogbones")
 
     startTlMarker = _design.timeline.markerPosition
+    # all faces are planned before the first combine feature cuts a body
+    snapshot = TopologySnapshot()
+
+    # the same face selected in several occurrences of a component is cut once, in the component
+    faces = nativeFaces(list(inputs.faces.values()))
+    if len(faces) < len(inputs.faces):
+        logger.info("%d selected faces are %d faces of their components", len(inputs.faces), len(faces))
+
+    if inputs.featureGrouping == FeatureGrouping.BODY:
+        faceGroups = groupFacesByBody(faces)
+    else:
+        faceGroups = [[face] for face in faces]
+
+    # all faces are planned up front, so the bodies can be planned in parallel
+    with profiler.stage('plan'):
+        plannedFaces = [face for faces in faceGroups for face in faces]
+        if analysis is None:
+            plans = iter(planDogeBones(plannedFaces, inputs, snapshot))
+        else:
+            plans = iter(analyseFaces(plannedFaces, inputs, analysis, snapshot))
+
+    features: List[adsk.fusion.BaseFeature] = []
+    # a corner edge reached from the faces of several features is cut by the first one
+    registry = CornerRegistry()
+
+    for faces in faceGroups:
+        with profiler.feature() as record:
+            toolBodies: List[adsk.fusion.BRepBody] = []
+            toolCorners: List[List[CornerPlan]] = []
+            facePlans = [next(plans) for _ in faces]
+            # faces whose corners are merged into the span of another face still belong to the feature
+            toolFaces = [face for face, plan in zip(faces, facePlans) if len(plan.corners) > 0]
+            shared = registry.removeOwned(facePlans)
+            edgeTokens = [corner.edgeToken for plan in facePlans for corner in plan.corners]
+            mergePlans(facePlans, inputs.toolDiameter.value)
+            for plan in facePlans:
+                for toolBody, corners in buildToolBodies(plan.corners, inputs.unionStrategy):
+                    toolBodies.append(toolBody)
+                    toolCorners.append(corners)
+
+            if len(toolBodies) == 0:
+                continue
+
+            # the earlier features have cut the body, the faces are read again, but not the whole body
+            with profiler.stage('fingerprint'):
+                fingerprint = getFingerprint(toolFaces, inputs, FaceSnapshot(toolFaces))
+            feature = createDogFeature(toolFaces, toolBodies, toolCorners, inputs, fingerprint)
+            registry.claim(edgeTokens, feature.entityToken)
+            if len(shared) > 0:
+                saveSharedCorners(feature, shared)
+            record.describe(feature)
+            features.append(feature)
 
-    # [str] faceId
-    # face [adsk.fusion.BRepFace]
-    for faceId, face in inputs.faces.items():
+    endTlMarker = _design.timeline.markerPosition - 1
+    if endTlMarker - startTlMarker > 0:
+        timelineGroup = _design.timeline.timelineGroups.add(
+            startTlMarker, endTlMarker
+        )
+        timelineGroup.name = "dogbone"
 
-        # TODO: topFace
-        topFace = None
+    with profiler.stage('state'):
+        recordUpdateState(_design, features, replace=False)
 
-        # if param.fromTop:
-        #     topFace, topFaceRefPoint = dbUtils.getTopFace(occurrenceFaces[0].native)
-        #     logger.debug(f"topFace ref point: {topFaceRefPoint.asArray()}")
-        #     logger.info(f"Processing holes from top face - {topFace.tempId}")
-        #     debugFace(topFace)
+    logger.info("Tool body cache: %s", toolBodyCache.summary())
 
-        toolBodies = createDogeBoneToolBody(face, inputs, topFace)
-        if toolBodies is None:
-            continue
 
-        baseFeature = _rootComp.features.baseFeatures.add()
+def nativeFaces(faces: List[adsk.fusion.BRepFace]) -> List[adsk.fusion.BRepFace]:
+    """
+    maps the faces to their native faces, dropping the faces selected again through another occurrence
+    """
+    unique: Dict[str, adsk.fusion.BRepFace] = {}
+    for face in faces:
+        face = native(face)
+        unique.setdefault(face.entityToken, face)
+    return list(unique.values())
+
+
+def groupFacesByBody(faces: List[adsk.fusion.BRepFace]) -> List[List[adsk.fusion.BRepFace]]:
+    """
+    groups the faces by the native body they belong to, keeping the selection order
+    """
+    groups: Dict[str, List[adsk.fusion.BRepFace]] = {}
+    for face in faces:
+        groups.setdefault(native(face).body.entityToken, []).append(face)
+    return list(groups.values())
+
+
+def createDogFeature(
+    faces: List[adsk.fusion.BRepFace], toolBodies: List[adsk.fusion.BRepBody], toolCorners: List[List[CornerPlan]],
+    inputs: DogeboneFeatureInput, fingerprint: str
+) -> adsk.fusion.BaseFeature:
+    """
+    adds a base feature holding the tool bodies and a combine feature cutting them from the body of the faces,
+    toolCorners are the corners of every tool body. Both features are added to the component of the body,
+    so every occurrence of the component is cut.
+    """
+    activeBody = native(faces[0]).body
+    component = activeBody.parentComponent or _rootComp
+
+    with profiler.stage('baseFeature'):
+        with profiler.call('baseFeatures.add'):
+            baseFeature = component.features.baseFeatures.add()
         baseFeature.name = "doge"
-        saveToFeature(baseFeature, inputs, face)
+        saveToFeature(baseFeature, inputs, faces)
+        baseFeature.attributes.add(GROUP_NAME, FINGERPRINT, fingerprint)
+        saveCornerRecords(baseFeature, [[corner.record() for corner in corners] for corners in toolCorners])
 
         baseFeature.startEdit()
-        dbB = _rootComp.bRepBodies.add(toolBodies, baseFeature)
-        dbB.name = "dogboneTool"
-        baseFeature.finishEdit()
-
+        for toolBody in toolBodies:
+            with profiler.call('bRepBodies.add'):
+                dbB = component.bRepBodies.add(toolBody, baseFeature)
+            dbB.name = "dogboneTool"
+        with profiler.call('finishEdit'):
+            baseFeature.finishEdit()
+
+    with profiler.stage('combine'):
         toolCollection = adsk.core.ObjectCollection.create()
-        toolCollection.add(baseFeature.bodies.item(0))
-
-        activeBody = native(face).body
+        for body in baseFeature.bodies:
+            toolCollection.add(body)
 
-        combineInput = _rootComp.features.combineFeatures.createInput(
+        combineInput = component.features.combineFeatures.createInput(
             targetBody=activeBody, toolBodies=toolCollection
         )
         combineInput.isKeepToolBodies = False
@@ -261,124 +406,708 @@ def createDogeBones(inputs: DogeboneFeatureInput):
         combineInput.operation = (
             adsk.fusion.FeatureOperations.CutFeatureOperation
         )
-        combine = _rootComp.features.combineFeatures.add(combineInput)
+        with profiler.call('combineFeatures.add'):
+            combine = component.features.combineFeatures.add(combineInput)
         combine.name = 'doge_combine'
 
-    endTlMarker = _design.timeline.markerPosition - 1
-    if endTlMarker - startTlMarker > 0:
-        timelineGroup = _design.timeline.timelineGroups.add(
-            startTlMarker, endTlMarker
-        )
-        timelineGroup.name = "dogbone"
+    return baseFeature
+
+
+def createDogeBoneToolBody(
+    face: adsk.fusion.BRepFace, inputs: DogeboneFeatureInput, snapshot: Optional[TopologySnapshot] = None
+) -> Optional[List[adsk.fusion.BRepBody]]:
+    with profiler.stage('plan'):
+        plan = planDogeBones([face], inputs, snapshot)[0]
+        mergePlans([plan], inputs.toolDiameter.value)
+
+    if len(plan.corners) == 0:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No edges found for face %s", face.entityToken)
+        return None
+
+    return executePlan(plan, inputs.unionStrategy)
+
+
+def planDogeBones(
+    faces: List[adsk.fusion.BRepFace], inputs: DogeboneFeatureInput, snapshot: Optional[TopologySnapshot] = None
+) -> List[DogbonePlan]:
+    """
+    plans the tool bodies of the faces from the topology snapshots of their bodies. The faces are planned per body,
+    in worker processes if parallel planning is enabled, the plans are returned in the order of the faces.
+    """
+    if snapshot is None:
+        snapshot = TopologySnapshot()
+
+    bodies: Dict[str, Tuple[BodyTopology, List[int]]] = {}
+    # the body and position within the body of every face, or the empty plan of a face that isn't in the snapshot
+    slots: List[Union[Tuple[str, int], DogbonePlan]] = []
+
+    for face in faces:
+        faceNative = native(face)
+        topology = snapshot.topology(faceNative.body)
+        faceIndex = topology.faceIndex.get(faceNative.entityToken)
+        if faceIndex is None:
+            slots.append(DogbonePlan(faceNative.entityToken, topology.bodyToken))
+            continue
+
+        _, bodyFaces = bodies.setdefault(topology.bodyToken, (topology, []))
+        slots.append((topology.bodyToken, len(bodyFaces)))
+        bodyFaces.append(faceIndex)
+
+    tokens = list(bodies.keys())
+    bodyPlans = dict(zip(tokens, planningPool.planBodies(
+        [bodies[token] for token in tokens], inputs.toolDiameter.value, _app.vectorAngleTolerance
+    )))
+
+    return [slot if isinstance(slot, DogbonePlan) else bodyPlans[slot[0]][slot[1]] for slot in slots]
+
+
+def analyseFaces(
+    faces: List[adsk.fusion.BRepFace], inputs: DogeboneFeatureInput, analysis: FaceAnalysisCache, snapshot: Optional[TopologySnapshot] = None
+) -> List[DogbonePlan]:
+    """
+    returns the plans of the native faces, only the faces the analysis doesn't know yet are planned
+    """
+    faceByToken = {face.entityToken: face for face in faces}
+    return analysis.plans(
+        [face.entityToken for face in faces], inputs.toolDiameter.value,
+        lambda tokens: planDogeBones([faceByToken[token] for token in tokens], inputs, snapshot)
+    )
 
 
-def createDogeBoneToolBody(face: adsk.fusion.BRepFace, inputs: DogeboneFeatureInput, topFace: Optional[adsk.fusion.BRepFace]) -> Optional[adsk.fusion.BRepBody]:
+class ToolBodyPreview(object):
+    """
+    Shows the tool bodies of the selected faces as custom graphics, without adding features to the timeline.
+    The corner bodies are kept by face and tool diameter, so after an input change only the faces that are
+    new, or planned for another diameter, get new bodies.
+    """
+
+    def __init__(self):
+        self._bodies: Dict[Tuple[str, float], List[adsk.fusion.BRepBody]] = {}
+        self._groups: List[adsk.fusion.CustomGraphicsGroup] = []
+
+    def show(self, faces: List[adsk.fusion.BRepFace], plans: List[DogbonePlan], toolDiameter: float):
+        """
+        draws the unmerged corners of the plans, faces are the native faces of the plans
+        """
+        self.hide()
+
+        bodies: Dict[Tuple[str, float], List[adsk.fusion.BRepBody]] = {}
+        groups: Dict[str, adsk.fusion.CustomGraphicsGroup] = {}
+        for face, plan in zip(faces, plans):
+            key = (plan.faceToken, toolDiameter)
+            faceBodies = self._bodies.get(key)
+            if faceBodies is None:
+                faceBodies = [createCornerBody(corner) for corner in plan.corners]
+            bodies[key] = faceBodies
+            if len(faceBodies) == 0:
+                continue
+
+            # like the cut, the preview is drawn in the component of the body, so every occurrence shows it
+            component = face.body.parentComponent or _rootComp
+            group = groups.get(component.entityToken)
+            if group is None:
+                group = component.customGraphicsGroups.add()
+                groups[component.entityToken] = group
+                self._groups.append(group)
+            for body in faceBodies:
+                group.addBRepBody(body)
+
+        # the bodies of deselected faces and of other tool diameters are dropped
+        self._bodies = bodies
+
+    def hide(self):
+        for group in self._groups:
+            if group.isValid:
+                group.deleteMe()
+        self._groups = []
+
+    def clear(self):
+        self.hide()
+        self._bodies.clear()
+
+
+def buildToolBody(corners: List[CornerPlan], strategy: str) -> adsk.fusion.BRepBody:
+    """
+    creates the tool bodies of the corners and unions them into a single body
+    """
+    toolBodies = [toolBody for toolBody, _ in buildToolBodies(corners, strategy)]
+    with profiler.stage('union'):
+        return reduceToolBodies(toolBodies, balanced=strategy != UnionStrategy.SEQUENTIAL)
+
+
+def groupToolBodies(bodies: List[adsk.fusion.BRepBody], strategy: str) -> List[List[int]]:
+    """
+    returns the indices of the tool bodies of the corners that are unioned, depending on the strategy
+    all bodies together or one group per cluster of overlapping corners
+    """
+    if len(bodies) == 0:
+        return []
+    if strategy == UnionStrategy.SEQUENTIAL:
+        return [list(range(len(bodies)))]
+
+    boxes = [getBoxTuple(body.boundingBox) for body in bodies]
+    return clusterBoxes(boxes)
+
+
+def reduceToolBodies(bodies: List[adsk.fusion.BRepBody], balanced=False) -> adsk.fusion.BRepBody:
+    """
+    unions the bodies into the first body, either by folding them one by one into it
+    or pairwise as a balanced tree, so no boolean runs against an ever growing accumulator
+    """
     tempBrepMgr = adsk.fusion.TemporaryBRepManager.get()
 
-    toolBodies: Optional[adsk.fusion.BRepBody] = None
-    edgesForFace = getDogboneEdgesForFace(face)
+    if not balanced:
+        for body in bodies[1:]:
+            with profiler.call('booleanOperation'):
+                tempBrepMgr.booleanOperation(bodies[0], body, adsk.fusion.BooleanTypes.UnionBooleanType)
+        return bodies[0]
+
+    while len(bodies) > 1:
+        for target, tool in zip(bodies[0::2], bodies[1::2]):
+            with profiler.call('booleanOperation'):
+                tempBrepMgr.booleanOperation(target, tool, adsk.fusion.BooleanTypes.UnionBooleanType)
+        bodies = bodies[0::2]
+
+    return bodies[0]
+
+
+def getBoxTuple(box: adsk.core.BoundingBox3D):
+    return getPointTuple(box.minPoint), getPointTuple(box.maxPoint)
+
 
-    if len(edgesForFace) == 0:
-        logger.debug(f"No edges found for face {face.entityToken}")
+def clusterBoxes(boxes: List[Tuple[Tuple[float, float, float], Tuple[float, float, float]]]) -> List[List[int]]:
+    """
+    groups the indices of overlapping (or touching) boxes, a sweep along x keeps this close to linear
+    for corners spread over a face. Within a cluster the indices are ordered along x.
+    """
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def overlaps(a, b):
+        return all(a[0][axis] <= b[1][axis] and b[0][axis] <= a[1][axis] for axis in range(3))
+
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i][0][0])
+    active: List[int] = []
+    for i in order:
+        active = [j for j in active if boxes[j][1][0] >= boxes[i][0][0]]
+        for j in active:
+            if overlaps(boxes[i], boxes[j]):
+                parent[find(i)] = find(j)
+        active.append(i)
+
+    clusters: Dict[int, List[int]] = {}
+    for i in order:
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def saveToFeature(feature: adsk.fusion.BaseFeature, inputs: DogeboneFeatureInput, faces: List[adsk.fusion.BRepFace]):
+    feature.attributes.add(GROUP_NAME, INPUT, inputs.asJson())
+    if len(faces) == 1:
+        feature.attributes.add(GROUP_NAME, FACE, faces[0].entityToken)
+    else:
+        feature.attributes.add(GROUP_NAME, FACES, json.dumps([face.entityToken for face in faces]))
+
+
+def findDogFeatures(design: adsk.fusion.Design) -> List[adsk.fusion.BaseFeature]:
+    """
+    returns the doge features of the design in timeline order, located through their input attribute
+    instead of walking the whole timeline
+    """
+    features: Dict[str, adsk.fusion.BaseFeature] = {}
+    for attribute in design.findAttributes(GROUP_NAME, INPUT):
+        feature = attribute.parent
+        if feature is None or feature.objectType != adsk.fusion.BaseFeature.classType():
+            continue
+        features[feature.entityToken] = cast(adsk.fusion.BaseFeature, feature)
+
+    return sorted(features.values(), key=lambda feature: feature.timelineObject.index)
+
+
+def getFaceTokens(feature: adsk.fusion.BaseFeature) -> List[str]:
+    faces = feature.attributes.itemByName(GROUP_NAME, FACES)
+    if faces:
+        return json.loads(faces.value)
+    return [feature.attributes.itemByName(GROUP_NAME, FACE).value]
+
+
+def saveCornerRecords(feature: adsk.fusion.BaseFeature, records: List[List[List]]):
+    feature.attributes.add(GROUP_NAME, CORNERS, json.dumps(records))
+
+
+def loadCornerRecords(feature: adsk.fusion.BaseFeature, bodyCount: int) -> Optional[List[List[List]]]:
+    """
+    returns the stored corners of every body of the feature, None for features without
+    records or whose bodies don't match them
+    """
+    attribute = feature.attributes.itemByName(GROUP_NAME, CORNERS)
+    if attribute is None:
         return None
+    records = json.loads(attribute.value)
+    return records if len(records) == bodyCount else None
 
-    for edge in edgesForFace:
-        if not toolBodies:
-            toolBodies = getToolBody(edge, face, inputs, topFace=topFace)
-        else:
-            tempBrepMgr.booleanOperation(
-                toolBodies,
-                getToolBody(edge, face, inputs, topFace=topFace),
-                adsk.fusion.BooleanTypes.UnionBooleanType,
+
+def saveSharedCorners(feature: adsk.fusion.BaseFeature, shared: Dict[str, str]):
+    feature.attributes.add(GROUP_NAME, SHARED, json.dumps(shared))
+
+
+def removeSharedCorners(feature: adsk.fusion.BaseFeature, plans: List[DogbonePlan]):
+    """
+    removes the corners whose edges another feature cuts from the plans of the feature, as recorded when it
+    was created. A corner is cut again if the other feature is gone or doesn't cut its edge anymore.
+    """
+    attribute = feature.attributes.itemByName(GROUP_NAME, SHARED)
+    if attribute is None:
+        return
+    shared: Dict[str, str] = json.loads(attribute.value)
+
+    ownerRecords: Dict[str, List[List]] = {}
+
+    def ownerCuts(owner: str, corner: CornerPlan) -> bool:
+        if owner not in ownerRecords:
+            entities = _design.findEntityByToken(owner)
+            records = None
+            if entities is not None and len(entities) == 1:
+                records = loadCornerRecords(entities[0], entities[0].bodies.count)
+            ownerRecords[owner] = [record for bodyRecords in records or [] for record in bodyRecords]
+        return any(recordCovers(record, corner) for record in ownerRecords[owner])
+
+    stillShared: Dict[str, str] = {}
+    for plan in plans:
+        corners = []
+        for corner in plan.corners:
+            owner = shared.get(corner.edgeToken)
+            if owner is not None and ownerCuts(owner, corner):
+                stillShared[corner.edgeToken] = owner
+            else:
+                corners.append(corner)
+        plan.corners = corners
+
+    if stillShared != shared:
+        saveSharedCorners(feature, stillShared)
+
+
+def _faceGeometry(topology: BodyTopology, faceIndex: int) -> list:
+    return [
+        vecmath.rounded(topology.faceNormal(faceIndex)),
+        sorted(vecmath.rounded(topology.vertexPoint(vertex)) for vertex in topology.faceVertices[faceIndex]),
+    ]
+
+
+def _hash(data) -> str:
+    return hashlib.sha1(json.dumps(data).encode('UTF-8')).hexdigest()
+
+
+def getSettingsFingerprint(inputs: DogeboneFeatureInput) -> str:
+    return _hash([vecmath.rounded([inputs.toolDiameter.value]), inputs.dogeboneType, inputs.unionStrategy])
+
+
+def getFingerprint(faces: List[adsk.fusion.BRepFace], inputs: DogeboneFeatureInput, snapshot: TopologySnapshot) -> str:
+    """
+    hashes everything the tool bodies of a feature are built from: the evaluated tool diameter, the settings,
+    the geometry of the faces and their detected corner edges. Coordinates are used instead of entity tokens,
+    as tokens change when the body is recomputed. The settings and the geometry are hashed separately,
+    so the geometry part can be kept when only the tool diameter changed.
+    """
+    data = []
+
+    for face in faces:
+        faceNative = native(face)
+        topology = snapshot.topology(faceNative.body)
+        faceIndex = topology.faceIndex.get(faceNative.entityToken)
+        if faceIndex is None:
+            data.append(None)
+            continue
+
+        corners = []
+        for edge in topology.dogboneEdges(faceIndex, _app.vectorAngleTolerance):
+            corners.append(
+                vecmath.rounded(topology.vertexPoint(topology.edgeStart[edge]) + topology.vertexPoint(topology.edgeEnd[edge])
+                                + topology.faceNormal(topology.edgeFace1[edge]) + topology.faceNormal(topology.edgeFace2[edge]))
             )
 
-    return toolBodies
+        data.append(_faceGeometry(topology, faceIndex) + [sorted(corners)])
 
+    return getSettingsFingerprint(inputs) + FINGERPRINT_SEPARATOR + _hash(data)
+
+
+def getFaceState(faces: List[adsk.fusion.BRepFace], snapshot: TopologySnapshot) -> str:
+    """
+    hashes the geometry of the faces at the current marker position, including the cuts of the dogbones, and of
+    the edges running away from their vertices. These edges are the corner edges, or what the dogbones left of
+    them, so a pocket that got deeper changes the state even though its face didn't move.
+    """
+    data = []
+    for face in faces:
+        faceNative = native(face)
+        topology = snapshot.topology(faceNative.body)
+        faceIndex = topology.faceIndex.get(faceNative.entityToken)
+        if faceIndex is None:
+            data.append(None)
+            continue
+
+        edges = sorted(
+            vecmath.rounded(topology.vertexPoint(topology.edgeStart[edge]) + topology.vertexPoint(topology.edgeEnd[edge]))
+            for edge in topology.candidateEdges(faceIndex)
+        )
+        data.append(_faceGeometry(topology, faceIndex) + [edges])
+    return _hash(data)
 
-def saveToFeature(feature: adsk.fusion.BaseFeature, inputs: DogeboneFeatureInput, face: adsk.fusion.BRepFace):
-    feature.attributes.add(GROUP_NAME, INPUT, inputs.asJson())
-    feature.attributes.add(GROUP_NAME, FACE, face.entityToken)
 
+def findFaces(entityTokens: List[str]) -> Optional[List[adsk.fusion.BRepFace]]:
+    faces: List[adsk.fusion.BRepFace] = []
+    for entityToken in entityTokens:
+        entities = _design.findEntityByToken(entityToken)
+
+        if not (entities is not None and len(entities) == 1):
+            return None
+
+        faces.append(cast(adsk.fusion.BRepFace, entities[0]))
+    return faces
+
+
+def getParameterIndex(design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature]) -> ParameterIndex:
+    index = ParameterIndex(design)
+    for feature in features:
+        input = DogeboneFeatureInput.fromJson(feature.attributes.itemByName(GROUP_NAME, INPUT).value)
+        index.add(feature.entityToken, input.toolDiameter.expression)
+    return index
+
+
+def loadParameterSnapshot(design: adsk.fusion.Design) -> Optional[Dict[str, float]]:
+    """
+    returns the parameter values stored by the last create or update, None if there are none
+    """
+    attribute = design.attributes.itemByName(GROUP_NAME, PARAMETERS)
+    if attribute is None:
+        return None
+    return json.loads(attribute.value)
+
+
+def recordUpdateState(design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature], replace=True):
+    """
+    stores the values of the parameters the features use and the current state of their faces, these
+    are the baseline of the next update of the affected features only.
+    With replace=False values of parameters already in the snapshot are kept, so features that weren't
+    updated still see the change of a parameter they share with new features.
+    """
+    values = readParameterValues(design, getParameterIndex(design, features).parameterNames)
+    if not replace:
+        values = {**values, **(loadParameterSnapshot(design) or {})}
+    design.attributes.add(GROUP_NAME, PARAMETERS, json.dumps(values))
 
-def updateDogFeature(feature: adsk.fusion.BaseFeature, obj: adsk.fusion.TimelineObject):
+    for feature in features:
+        faces = findFaces(getFaceTokens(feature))
+        if faces is not None:
+            feature.attributes.add(GROUP_NAME, FACE_STATE, getFaceState(faces, FaceSnapshot(faces)))
+
+
+def findUnchangedFeatures(design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature]) -> Set[str]:
+    """
+    returns the entity tokens of the features whose faces are unchanged since the last update and whose bodies
+    aren't cut by an earlier feature with changed faces. Only the tool diameter of these features can have changed.
+    """
+    with profiler.stage('unchanged'):
+        changedBodies = set()
+        unchanged = set()
+
+        for feature in features:
+            faces = findFaces(getFaceTokens(feature))
+            bodies = {native(face).body.entityToken for face in faces} if faces is not None else set()
+            faceState = feature.attributes.itemByName(GROUP_NAME, FACE_STATE)
+
+            if (
+                faces is None
+                or faceState is None
+                or faceState.value != getFaceState(faces, FaceSnapshot(faces))
+                or not bodies.isdisjoint(changedBodies)
+            ):
+                changedBodies.update(bodies)
+            else:
+                unchanged.add(feature.entityToken)
+
+        return unchanged
+
+
+def findAffectedFeatures(
+    design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature], unchanged: Optional[Set[str]] = None
+) -> List[adsk.fusion.BaseFeature]:
+    """
+    returns the features (in timeline order) that use a parameter whose value changed since the last update,
+    whose faces changed, or whose body is cut by an earlier affected feature. unchanged are the tokens
+    returned by findUnchangedFeatures, if they're already known.
+    """
+    if unchanged is None:
+        unchanged = findUnchangedFeatures(design, features)
+    with profiler.stage('affected'):
+        return _findAffectedFeatures(design, features, unchanged)
+
+
+def _findAffectedFeatures(design: adsk.fusion.Design, features: List[adsk.fusion.BaseFeature], unchanged: Set[str]) -> List[adsk.fusion.BaseFeature]:
+    index = getParameterIndex(design, features)
+    values = readParameterValues(design, index.parameterNames)
+    snapshot = loadParameterSnapshot(design)
+    changed = list(values.keys()) if snapshot is None else changedParameters(snapshot, values)
+    usingChanged = index.featuresUsing(changed)
+
+    affectedBodies = set()
+    affected: List[adsk.fusion.BaseFeature] = []
+
+    for feature in features:
+        faces = findFaces(getFaceTokens(feature))
+        bodies = {native(face).body.entityToken for face in faces} if faces is not None else set()
+
+        if (
+            feature.entityToken in usingChanged
+            or feature.entityToken not in unchanged
+            or not bodies.isdisjoint(affectedBodies)
+        ):
+            affected.append(feature)
+            affectedBodies.update(bodies)
+
+    logger.info("%d of %d dogbone features affected, changed parameters: %s", len(affected), len(features), ', '.join(changed))
+    return affected
+
+
+def updateDogFeature(
+    feature: adsk.fusion.BaseFeature, obj: adsk.fusion.TimelineObject, scheduler: Optional[UpdateScheduler] = None, facesUnchanged=False
+) -> bool:
+    """
+    rebuilds the tool bodies of a doge feature, returns False if the feature isn't a doge feature or
+    its fingerprint or its corners show that nothing relevant has changed. With facesUnchanged the stored corners
+    are placed for the current tool diameter, without reading the faces.
+    """
     attributes = feature.attributes.itemsByGroup(GROUP_NAME)
 
     isDogFeature = attributes is not None and len(attributes) > 0
     if not isDogFeature:
-        return
+        return False
 
-    logger.debug(f"update feature '{feature.name}' at index: {obj.index}")
+    # the arguments are API calls, they're only made when they're logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("update feature '%s' at index: %d", feature.name, obj.index)
 
     inputAsJson = feature.attributes.itemByName(GROUP_NAME, INPUT).value
-    entityToken = feature.attributes.itemByName(GROUP_NAME, FACE).value
+    entityTokens = getFaceTokens(feature)
 
-    if not obj.rollTo(False):
+    with profiler.stage('rollTo'):
+        rolled = scheduler.rollTo(obj) if scheduler else obj.rollTo(False)
+    if not rolled:
         raise Exception('Cannot rollback history')
 
-    entities = _design.findEntityByToken(entityToken)
+    input = DogeboneFeatureInput.fromJson(inputAsJson)
+    if facesUnchanged:
+        updated = replanDogFeature(feature, input)
+        if updated is not None:
+            return updated
 
-    if not (entities is not None and len(entities) == 1):
+    faces = findFaces(entityTokens)
+    if faces is None:
         raise Exception('Cannot find initial face')
 
-    face = cast(adsk.fusion.BRepFace, entities[0])
-    input = DogeboneFeatureInput.fromJson(inputAsJson)
-
-    # TODO: topFace
-    toolBodies = createDogeBoneToolBody(face, input, None)
-    if toolBodies is None:
+    # only the surroundings of the faces are read, not their whole bodies
+    snapshot = FaceSnapshot(faces)
+
+    # the face geometry has to be read at the feature's position in the timeline, so the
+    # roll back is needed, but the edit of the feature and everything it invalidates is not
+    with profiler.stage('fingerprint'):
+        fingerprint = getFingerprint(faces, input, snapshot)
+    storedFingerprint = feature.attributes.itemByName(GROUP_NAME, FINGERPRINT)
+    if storedFingerprint is not None and storedFingerprint.value == fingerprint:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("skip unchanged feature '%s'", feature.name)
+        return False
+
+    with profiler.stage('plan'):
+        plans = planDogeBones(faces, input, snapshot)
+        removeSharedCorners(feature, plans)
+        mergePlans(plans, input.toolDiameter.value)
+
+    corners = [corner for plan in plans for corner in plan.corners]
+    if len(corners) == 0:
         raise Exception('Cannot create tool bodies')
 
-    feature.startEdit()
-    feature.updateBody(feature.bodies[0], toolBodies)
-    feature.finishEdit()
+    bodies = [body for body in feature.bodies]
+    records = loadCornerRecords(feature, len(bodies))
+
+    if records is None:
+        toolBodies: Dict[int, adsk.fusion.BRepBody] = {}
+        records = []
+        for plan in plans:
+            for toolBody, toolCorners in buildToolBodies(plan.corners, input.unionStrategy):
+                toolBodies[len(records)] = toolBody
+                records.append([corner.record() for corner in toolCorners])
+        fitToolBodies(toolBodies, records, len(bodies))
+    else:
+        patch = diffCorners(records, corners)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "patch feature '%s': %d bodies kept, %d rebuilt, %d corners added",
+                feature.name, len(patch.kept), len(patch.rebuilt), len(patch.added)
+            )
+        if patch.isEmpty():
+            # the faces changed but their corners didn't, the bodies and their records stay as they are
+            feature.attributes.add(GROUP_NAME, FINGERPRINT, fingerprint)
+            return False
+        toolBodies = patchToolBodies(bodies, records, patch, input.unionStrategy)
 
+    replaceFeatureBodies(feature, bodies, toolBodies)
 
-def getDogboneEdgesForFace(face) -> List[adsk.fusion.BRepEdge]:
-    faceNormal = getFaceNormal(face)
+    feature.attributes.add(GROUP_NAME, FINGERPRINT, fingerprint)
+    saveCornerRecords(feature, records)
+    return True
 
-    faceEdgesSet = {edge.entityToken for edge in face.edges}
-    faceVertices = [vertex for vertex in face.vertices]
 
-    allEdges = {}
+def replanDogFeature(feature: adsk.fusion.BaseFeature, input: DogeboneFeatureInput) -> Optional[bool]:
+    """
+    rebuilds the tool bodies of a feature whose faces haven't changed from its stored corners, so neither
+    the faces nor their edges are searched. Returns False if the tool diameter is unchanged as well, and
+    None if the feature doesn't have the records to do so. The face state covers the corner edges, so
+    findUnchangedFeatures doesn't report a feature whose corners moved.
+    """
+    storedFingerprint = feature.attributes.itemByName(GROUP_NAME, FINGERPRINT)
+    bodies = [body for body in feature.bodies]
+    records = loadCornerRecords(feature, len(bodies))
+    if (
+        storedFingerprint is None
+        or FINGERPRINT_SEPARATOR not in storedFingerprint.value
+        or records is None
+        or not all(isRecord(record) for bodyRecords in records for record in bodyRecords)
+    ):
+        return None
 
-    for vertex in faceVertices:
-        allEdges.update({edge.entityToken: edge for edge in vertex.edges})
+    _, geometryFingerprint = storedFingerprint.value.split(FINGERPRINT_SEPARATOR)
+    fingerprint = getSettingsFingerprint(input) + FINGERPRINT_SEPARATOR + geometryFingerprint
+    if fingerprint == storedFingerprint.value:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("skip unchanged feature '%s'", feature.name)
+        return False
 
-    # TODO: seems we can skip the filtering, by just saying that the edges of a face, won't be a candidate
-    # because it's not parallel to the normal
-    candidateEdgesId = set(allEdges.keys()) - faceEdgesSet
-    candidateEdges = [allEdges[edgeId] for edgeId in candidateEdgesId]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("replan feature '%s' for tool diameter %f", feature.name, input.toolDiameter.value)
 
-    edges: List[adsk.fusion.BRepEdge] = []
+    with profiler.stage('plan'):
+        bodyCorners = [[replanCorner(record, input.toolDiameter.value) for record in bodyRecords] for bodyRecords in records]
 
-    for edge in candidateEdges:
-        if not edge.isValid or edge.isDegenerate:
-            continue
+    toolBodies: Dict[int, adsk.fusion.BRepBody] = {}
+    for i, corners in enumerate(bodyCorners):
+        toolBodies[i] = buildToolBody(corners, input.unionStrategy)
+    replaceFeatureBodies(feature, bodies, toolBodies)
 
-        if edge.geometry.curveType != adsk.core.Curve3DTypes.Line3DCurveType:
-            continue
+    feature.attributes.add(GROUP_NAME, FINGERPRINT, fingerprint)
+    saveCornerRecords(feature, [[corner.record() for corner in corners] for corners in bodyCorners])
+    return True
 
-        edgeVector = getEdgeVector(edge, refFace=face)
-        edgeVector.normalize()
 
-        if not edgeVector.isParallelTo(faceNormal):
-            continue
+def replaceFeatureBodies(feature: adsk.fusion.BaseFeature, bodies: List[adsk.fusion.BRepBody], toolBodies: Dict[int, adsk.fusion.BRepBody]):
+    """
+    replaces the feature bodies by the tool bodies with the same index in a single edit of the feature
+    """
+    if len(toolBodies) == 0:
+        return
 
-        if edgeVector.isEqualTo(faceNormal):
-            continue
+    with profiler.stage('edit'):
+        feature.startEdit()
+        for i, toolBody in toolBodies.items():
+            with profiler.call('updateBody'):
+                feature.updateBody(bodies[i], toolBody)
+        with profiler.call('finishEdit'):
+            feature.finishEdit()
 
-        face1, face2 = edge.faces
 
-        if face1.geometry.objectType != adsk.core.Plane.classType():
-            continue
+def fitToolBodies(toolBodies: Dict[int, adsk.fusion.BRepBody], records: List[List[List]], bodyCount: int):
+    """
+    fits the new tool bodies of a feature and their corner records to the bodies of the feature, the combine
+    feature references them, so their number can't change. Surplus tool bodies are unioned into the last body,
+    surplus feature bodies get the last tool body again, cutting the same volume twice doesn't change the result.
+    """
+    if len(records) > bodyCount:
+        surplus = [toolBodies.pop(i) for i in range(bodyCount - 1, len(records))]
+        toolBodies[bodyCount - 1] = reduceToolBodies(surplus)
+        records[bodyCount - 1:] = [[record for corners in records[bodyCount - 1:] for record in corners]]
 
-        if face2.geometry.objectType != adsk.core.Plane.classType():
-            continue
+    last = len(records) - 1
+    for i in range(len(records), bodyCount):
+        toolBodies[i] = toolBodies[last]
+        records.append(records[last])
 
-        angle = getAngleBetweenFaces(edge) * 180 / math.pi
-        if abs(angle - 90) > 0.001:
-            continue
 
-        edges.append(edge)
+def patchToolBodies(
+    bodies: List[adsk.fusion.BRepBody], records: List[List[List]], patch: CornerPatch, strategy: str
+) -> Dict[int, adsk.fusion.BRepBody]:
+    """
+    creates the tool bodies for the feature bodies the patch changes, only the corners of these bodies are
+    created again. Returns them by the index of the feature body, the records are updated in place.
+    """
+    tempBrepMgr = adsk.fusion.TemporaryBRepManager.get()
+    toolBodies: Dict[int, adsk.fusion.BRepBody] = {}
+
+    for i, corners in patch.rebuilt.items():
+        if len(corners) > 0:
+            toolBodies[i] = buildToolBody(corners, strategy)
+            records[i] = [corner.record() for corner in corners]
+
+    if len(patch.added) > 0:
+        # there's no rebuilt body, the new corners are cut together with the corners of a kept one
+        i = patch.kept[-1]
+        with profiler.call('copy'):
+            toolBody = tempBrepMgr.copy(bodies[i])
+        toolBodies[i] = reduceToolBodies([toolBody] + [added for added, _ in buildToolBodies(patch.added, strategy)])
+        records[i] = records[i] + [corner.record() for corner in patch.added]
+
+    for i, corners in patch.rebuilt.items():
+        if len(corners) == 0:
+            # the corners of the body are gone, but the body can't be removed
+            source = next(iter(toolBodies), None)
+            with profiler.call('copy'):
+                if source is None:
+                    source = patch.kept[0]
+                    toolBodies[i] = tempBrepMgr.copy(bodies[source])
+                else:
+                    toolBodies[i] = tempBrepMgr.copy(toolBodies[source])
+            records[i] = records[source]
+
+    return toolBodies
+
+
+def getDogboneEdgesForFace(face: adsk.fusion.BRepFace, snapshot: Optional[TopologySnapshot] = None) -> List[adsk.fusion.BRepEdge]:
+    """
+    returns the native edges of the inside 90° corners that start at the face and run parallel to the face normal.
+    the edges are classified against the topology snapshot of the face's body, not the live B-Rep.
+    """
+    if snapshot is None:
+        snapshot = TopologySnapshot()
+
+    faceNative = native(face)
+    topology = snapshot.topology(faceNative.body)
+
+    faceIndex = topology.faceIndex.get(faceNative.entityToken)
+    if faceIndex is None or not topology.facePlanar[faceIndex]:
+        return []
+
+    return [snapshot.edge(topology, edge) for edge in topology.dogboneEdges(faceIndex, _app.vectorAngleTolerance)]
+
+
+def findDogboneFaces(
+    body: adsk.fusion.BRepBody, toolAxis: Vector, snapshot: Optional[TopologySnapshot] = None
+) -> List[adsk.fusion.BRepFace]:
+    """
+    returns the native planar faces of the body facing along the tool axis that have dogbone edges, found in one
+    pass over the edges of the body. The axis is given in the coordinates of the body's component.
+    """
+    if snapshot is None:
+        snapshot = TopologySnapshot()
+
+    body = native(body)
+    topology = snapshot.topology(body)
+    faces = topology.dogboneFaces(toolAxis, _app.vectorAngleTolerance)
 
-    return edges
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("found %d dogbone faces of %d faces on body %s", len(faces), len(topology.faceTokens), body.name)
+    return [body.faces.item(face) for face in faces]
@@ -1,15 +1,87 @@
+import atexit
+import json
 import logging
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+# Records are put on a queue by the calling thread, usually Fusion's UI thread, and written to the
+# file by a background thread. The level is read from DOGE_LOG_LEVEL or the logLevel of defaults.json.
+# Nothing is written before the add-in starts logging, so importing the module, e.g. in a planning
+# worker or a benchmark, doesn't touch the log file.
+
+LOG_LEVEL_ENV = 'DOGE_LOG_LEVEL'
+DEFAULT_LEVEL = logging.INFO
+
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+
+APP_PATH = os.path.dirname(os.path.abspath(__file__))
+LOG_FILENAME = os.path.join(APP_PATH, "doge.log")
+
+
+def readLevel() -> int:
+    name = os.environ.get(LOG_LEVEL_ENV)
+    if not name:
+        try:
+            with open(os.path.join(APP_PATH, 'defaults.json'), 'r', encoding='UTF-8') as json_file:
+                name = json.load(json_file).get('logLevel')
+        except (OSError, ValueError, AttributeError):
+            name = None
+
+    level = logging.getLevelName(str(name).upper()) if name else DEFAULT_LEVEL
+    return level if isinstance(level, int) else DEFAULT_LEVEL
+
 
 logger = logging.getLogger("doge")
-logger.setLevel(logging.DEBUG)
+logger.setLevel(readLevel())
 
 formatter = logging.Formatter(
     "%(asctime)s ; %(name)s ; %(levelname)s ; %(lineno)d; %(message)s"
 )
-logHandler = logging.FileHandler(
-    os.path.join(os.path.dirname(os.path.abspath(__file__)), "doge.log"), mode="w"
-)
+logHandler = RotatingFileHandler(LOG_FILENAME, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding='UTF-8', delay=True)
 logHandler.setFormatter(formatter)
-logHandler.flush()
-logger.addHandler(logHandler)
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_queueHandler = QueueHandler(_queue)
+_listener: Optional[QueueListener] = None
+
+
+def startLogging():
+    """
+    starts a new log file and the background thread, has to be called by the add-in when it starts, in
+    Fusion's process only
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    # the logger outlives a reload of the add-in, it must not keep the handler of the previous one
+    for handler in [handler for handler in logger.handlers if isinstance(handler, QueueHandler)]:
+        logger.removeHandler(handler)
+
+    # every session starts with a new file, the previous ones are kept as backups
+    if os.path.isfile(LOG_FILENAME) and os.path.getsize(LOG_FILENAME) > 0:
+        logHandler.doRollover()
+
+    logger.addHandler(_queueHandler)
+    _listener = QueueListener(_queue, logHandler)
+    _listener.start()
+
+
+def stopLogging():
+    """
+    writes the queued records and stops the background thread, has to be called when the add-in stops
+    """
+    global _listener
+    if _listener is not None:
+        logger.removeHandler(_queueHandler)
+        _listener.stop()
+        _listener = None
+    # a reloaded add-in has to be able to rename the file
+    logHandler.close()
+
+
+# Fusion doesn't always call stop() when it exits
+atexit.register(stopLogging)
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import adsk.core
 import adsk.fusion
@@ -18,6 +18,79 @@ class DogeboneType:
     MORTISE = 'mortise'
 
 
+class FeatureGrouping:
+    # one base feature and combine per selected face
+    FACE = 'face'
+    # one base feature and combine per target body, holding the tool bodies of all its selected faces
+    BODY = 'body'
+
+
+class UnionStrategy:
+    # fold every corner into one growing accumulator
+    SEQUENTIAL = 'sequential'
+    # union overlapping corners pairwise as a balanced tree, disjoint groups stay separate bodies
+    TREE = 'tree'
+
+
+class ExpressionCache(object):
+    """
+    Caches evaluated expressions for the parameter state of the active design: the default length unit and
+    the names and expressions of all parameters. The state is read once after every invalidate() and
+    the cache is emptied when it differs, so every distinct expression is evaluated once per state.
+    """
+
+    def __init__(self):
+        self._state: Optional[Tuple] = None
+        self._isStateCurrent = False
+        self._values: Dict[str, float] = {}
+        self._validity: Dict[str, bool] = {}
+
+    def invalidate(self):
+        """
+        has to be called whenever the parameters may have changed, i.e. when a command starts
+        """
+        self._isStateCurrent = False
+
+    @staticmethod
+    def _unitsManager():
+        return adsk.core.Application.get().activeProduct.unitsManager
+
+    def _checkState(self):
+        if self._isStateCurrent:
+            return
+
+        product = adsk.core.Application.get().activeProduct
+        # model parameters can be referenced as well, e.g. 'd1 + 1 mm'
+        allParameters = getattr(product, 'allParameters', None)
+        parameters = tuple((p.name, p.expression) for p in allParameters) if allParameters else ()
+        state = (product.unitsManager.defaultLengthUnits, parameters)
+        if state != self._state:
+            self._values.clear()
+            self._validity.clear()
+            self._state = state
+        self._isStateCurrent = True
+
+    def value(self, expression: str) -> float:
+        self._checkState()
+        value = self._values.get(expression)
+        if value is None:
+            value = self._unitsManager().evaluateExpression(expression)
+            self._values[expression] = value
+        return value
+
+    def isValid(self, expression: str) -> bool:
+        self._checkState()
+        valid = self._validity.get(expression)
+        if valid is None:
+            unitsManager = self._unitsManager()
+            valid = unitsManager.isValidExpression(expression, unitsManager.defaultLengthUnits)
+            self._validity[expression] = valid
+        return valid
+
+
+expressionCache = ExpressionCache()
+
+
 class FusionExpression(object):
     def __init__(self, expression):
         self._expression = expression
@@ -32,13 +105,11 @@ class FusionExpression(object):
 
     @property
     def value(self):
-        unitsManager = adsk.core.Application.get().activeProduct.unitsManager
-        return unitsManager.evaluateExpression(self._expression)
+        return expressionCache.value(self._expression)
 
     @property
     def isValid(self):
-        unitsManager = adsk.core.Application.get().activeProduct.unitsManager
-        return unitsManager.isValidExpression(self._expression, unitsManager.defaultLengthUnits)
+        return expressionCache.isValid(self._expression)
 
 
 # Fusion distinguishes three types of parameters:
@@ -49,24 +120,36 @@ class FusionExpression(object):
 class DogeboneFeatureInput(object):
     DEFAULTS_FILENAME = os.path.join(APP_PATH, 'defaults.json')
     DEFAULTS_DATA = {}
+    # modification time and size of the defaults file DEFAULTS_DATA has been read from
+    DEFAULTS_STAT: Optional[Tuple[int, int]] = None
 
-    def __init__(self):
+    def __init__(self, loadDefaults=True):
         # Entities
         self.faces: Dict[str, adsk.fusion.BRepFace] = {}
         # Settings
         self.dogeboneType = DogeboneType.NORMAL
+        self.unionStrategy = UnionStrategy.TREE
+        self.featureGrouping = FeatureGrouping.BODY
         # Values
         self.toolDiameter = FusionExpression("3.175 mm")
-        self.readDefaults()
+        if loadDefaults:
+            self.readDefaults()
 
     def writeDefaults(self):
+        # keep settings that aren't part of the feature input, like the log level
+        data = {**self.loadDefaults(), **self.data()}
         with open(self.DEFAULTS_FILENAME, 'w', encoding='UTF-8') as json_file:
-            json.dump(self.data(), json_file, ensure_ascii=False)
+            json.dump(data, json_file, ensure_ascii=False)
+
+        DogeboneFeatureInput.DEFAULTS_DATA = data
+        DogeboneFeatureInput.DEFAULTS_STAT = self._defaultsStat()
 
     def data(self):
         return {
             'dogeboneType': self.dogeboneType,
-            'toolDiameter': self.toolDiameter.expression
+            'toolDiameter': self.toolDiameter.expression,
+            'unionStrategy': self.unionStrategy,
+            'featureGrouping': self.featureGrouping
         }
 
     def asJson(self) -> str:
@@ -76,9 +159,12 @@ class DogeboneFeatureInput(object):
     def fromJson(cls, data: str) -> "DogeboneFeatureInput":
         data = json.loads(data)
 
-        input = DogeboneFeatureInput()
+        # everything is stored with the feature, there's no need to load the defaults
+        input = DogeboneFeatureInput(loadDefaults=False)
         input.dogeboneType = data['dogeboneType']
         input.toolDiameter = FusionExpression(data['toolDiameter'])
+        input.unionStrategy = data.get('unionStrategy', UnionStrategy.SEQUENTIAL)
+        input.featureGrouping = data.get('featureGrouping', FeatureGrouping.FACE)
 
         return input
 
@@ -90,15 +176,40 @@ class DogeboneFeatureInput(object):
             else:
                 return default
 
-        if not os.path.isfile(self.DEFAULTS_FILENAME):
-            return
-        with open(self.DEFAULTS_FILENAME, 'r', encoding='UTF-8') as json_file:
+        data = self.loadDefaults()
+
+        self.dogeboneType = data.get('dogeboneType', self.dogeboneType)
+        self.unionStrategy = data.get('unionStrategy', self.unionStrategy)
+        self.featureGrouping = data.get('featureGrouping', self.featureGrouping)
+        self.toolDiameter = expressionOrDefault(data.get('toolDiameter'), self.toolDiameter)
+
+    @classmethod
+    def _defaultsStat(cls) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(cls.DEFAULTS_FILENAME)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def loadDefaults(cls) -> Dict:
+        """
+        returns the content of the defaults file, it's only read again when its modification time or size changed
+        """
+        stat = cls._defaultsStat()
+        if stat is None:
+            return {}
+        if stat == DogeboneFeatureInput.DEFAULTS_STAT:
+            return DogeboneFeatureInput.DEFAULTS_DATA
+
+        with open(cls.DEFAULTS_FILENAME, 'r', encoding='UTF-8') as json_file:
             try:
                 data = json.load(json_file)
             except Exception as e:
                 logger.exception(e)
-                util.reportError('Cannot read default options. Invalid JSON in "%s":' % self.DEFAULTS_FILENAME)
+                util.reportError('Cannot read default options. Invalid JSON in "%s":' % cls.DEFAULTS_FILENAME)
                 data = {}
 
-        self.dogeboneType = data.get('dogeboneType', self.dogeboneType)
-        self.toolDiameter = expressionOrDefault(data.get('toolDiameter'), self.toolDiameter)
+        DogeboneFeatureInput.DEFAULTS_DATA = data
+        DogeboneFeatureInput.DEFAULTS_STAT = stat
+        return data
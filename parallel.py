@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import runpy
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional, Tuple
+
+from .log import logger
+from .planner import DogbonePlan, planBody
+from .topology import BodyTopology
+
+# Plans the bodies of an operation in worker processes. Workers only get the topology snapshots, the
+# planning is pure Python, creating the tool bodies stays on Fusion's main thread.
+
+WORKERS_ENV = 'DOGE_PLANNING_WORKERS'
+
+# below this number of faces starting and feeding the workers costs more than it saves
+MIN_PARALLEL_FACES = 32
+
+APP_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# the worker runs it before unpickling its first task, see worker.py
+WORKER_SCRIPT = os.path.join(APP_PATH, 'worker.py')
+
+
+def workerCount() -> int:
+    try:
+        return int(os.environ.get(WORKERS_ENV, '0'))
+    except ValueError:
+        return 0
+
+
+def pythonExecutable() -> Optional[str]:
+    """
+    returns the interpreter for the workers. Inside Fusion sys.executable can be Fusion itself,
+    which must not be spawned, the bundled interpreter is looked up next to the standard library instead.
+    """
+    candidates = [sys.executable]
+    for directory in (sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')):
+        candidates.extend(os.path.join(directory, name) for name in ('python.exe', 'python3', 'python'))
+
+    for candidate in candidates:
+        if candidate and os.path.basename(candidate).lower().startswith('python') and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class PlanningPool(object):
+    """
+    Keeps the worker processes between operations, shutdown() has to be called when the add-in stops.
+    Planning falls back to the serial path whenever the workers can't be used.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers = 0
+
+    def _getExecutor(self, workers: int) -> Optional[ProcessPoolExecutor]:
+        if self._executor is not None and self._workers == workers:
+            return self._executor
+        self.shutdown()
+
+        executable = pythonExecutable()
+        if executable is None:
+            return None
+
+        context = multiprocessing.get_context('spawn')
+        context.set_executable(executable)
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=runpy.run_path,
+            initargs=(WORKER_SCRIPT, {'PACKAGE_NAME': __package__, 'PACKAGE_PATH': APP_PATH}),
+        )
+        self._workers = workers
+        return self._executor
+
+    def planBodies(self, bodies: List[Tuple[BodyTopology, List[int]]], toolDiameter: float, angleTolerance: float) -> List[List[DogbonePlan]]:
+        """
+        plans the faces of every body, the result is the same as planning them one after another
+        """
+        workers = workerCount()
+        faceCount = sum(len(faces) for _, faces in bodies)
+
+        if workers > 1 and len(bodies) > 1 and faceCount >= MIN_PARALLEL_FACES:
+            try:
+                return self.planInWorkers(bodies, toolDiameter, angleTolerance, workers)
+            except Exception as e:
+                logger.warning("Parallel planning failed, planning serially: %s", e)
+                self.shutdown()
+
+        return [planBody(topology, faces, toolDiameter, angleTolerance) for topology, faces in bodies]
+
+    def planInWorkers(
+        self, bodies: List[Tuple[BodyTopology, List[int]]], toolDiameter: float, angleTolerance: float, workers: int
+    ) -> List[List[DogbonePlan]]:
+        """
+        plans the bodies in the worker processes, raises when they can't be used
+        """
+        executor = self._getExecutor(workers)
+        if executor is None:
+            raise Exception('no Python interpreter found for the planning workers')
+
+        topologies = [topology for topology, _ in bodies]
+        faces = [faces for _, faces in bodies]
+        return list(executor.map(planBody, topologies, faces, repeat(toolDiameter), repeat(angleTolerance)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._workers = 0
+
+
+planningPool = PlanningPool()
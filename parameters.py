@@ -0,0 +1,75 @@
+import re
+from typing import Dict, Iterable, List, Set
+
+import adsk.fusion
+
+_IDENTIFIER = re.compile(r'[^\W\d]\w*')
+
+
+def referencedParameters(design: adsk.fusion.Design, expression: str) -> Set[str]:
+    """
+    returns the names of all parameters the expression depends on, directly or through the expressions
+    of other parameters. Identifiers that aren't parameters, like units and functions, are ignored.
+    """
+    parameters = design.allParameters
+    names: Set[str] = set()
+    pending = [expression]
+
+    while pending:
+        for name in _IDENTIFIER.findall(pending.pop()):
+            if name in names:
+                continue
+            parameter = parameters.itemByName(name)
+            if parameter is None:
+                continue
+            names.add(name)
+            pending.append(parameter.expression)
+
+    return names
+
+
+class ParameterIndex(object):
+    """
+    Maps parameter names to the doge features whose tool diameter expression uses them.
+    """
+
+    def __init__(self, design: adsk.fusion.Design):
+        self._design = design
+        self._features: Dict[str, Set[str]] = {}
+        self._expressions: Dict[str, Set[str]] = {}
+
+    def add(self, featureToken: str, expression: str):
+        names = self._expressions.get(expression)
+        if names is None:
+            names = referencedParameters(self._design, expression)
+            self._expressions[expression] = names
+
+        for name in names:
+            self._features.setdefault(name, set()).add(featureToken)
+
+    @property
+    def parameterNames(self) -> Set[str]:
+        return set(self._features.keys())
+
+    def featuresUsing(self, names: Iterable[str]) -> Set[str]:
+        features: Set[str] = set()
+        for name in names:
+            features.update(self._features.get(name, ()))
+        return features
+
+
+def readParameterValues(design: adsk.fusion.Design, names: Iterable[str]) -> Dict[str, float]:
+    parameters = design.allParameters
+    values: Dict[str, float] = {}
+    for name in names:
+        parameter = parameters.itemByName(name)
+        if parameter is not None:
+            values[name] = parameter.value
+    return values
+
+
+def changedParameters(snapshot: Dict[str, float], values: Dict[str, float]) -> List[str]:
+    """
+    returns the names whose value differs from the snapshot, or that weren't in the snapshot
+    """
+    return [name for name, value in values.items() if name not in snapshot or abs(snapshot[name] - value) > 1e-9]
@@ -0,0 +1,417 @@
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+from . import vecmath
+from .topology import BodyTopology
+from .vecmath import Vector
+
+# Plans hold every geometric decision about the tool bodies as plain data, geometry.executePlan
+# turns them into temporary B-Rep bodies. Planning only needs a BodyTopology, not adsk.
+
+
+class ClearanceBox(object):
+    """
+    box clearing the path of the tool into an acute corner, the parameters of an OrientedBoundingBox3D
+    """
+
+    def __init__(self, centre: Vector, lengthDirection: Vector, widthDirection: Vector, length: float, width: float, height: float):
+        self.centre = centre
+        self.lengthDirection = lengthDirection
+        self.widthDirection = widthDirection
+        self.length = length
+        self.width = width
+        self.height = height
+
+    def data(self) -> Dict:
+        return {
+            'centre': list(self.centre),
+            'lengthDirection': list(self.lengthDirection),
+            'widthDirection': list(self.widthDirection),
+            'length': self.length,
+            'width': self.width,
+            'height': self.height
+        }
+
+    @classmethod
+    def fromData(cls, data: Dict) -> "ClearanceBox":
+        return ClearanceBox(
+            tuple(data['centre']), tuple(data['lengthDirection']), tuple(data['widthDirection']),
+            data['length'], data['width'], data['height']
+        )
+
+
+class CornerPlan(object):
+    """
+    the tool body of one corner: a cylinder around the axis from start to end, start lies in the plane of the face.
+    The axis is the corner edge from edgeStart to edgeEnd, moved by the radius along the corner vector.
+    """
+
+    def __init__(
+        self, edgeToken: str, edgeStart: Vector, edgeEnd: Vector, corner: Vector, start: Vector, end: Vector, radius: float, angle: float,
+        clearance: Optional[ClearanceBox] = None
+    ):
+        self.edgeToken = edgeToken
+        self.edgeStart = edgeStart
+        self.edgeEnd = edgeEnd
+        self.corner = corner
+        self.start = start
+        self.end = end
+        self.radius = radius
+        self.angle = angle
+        self.clearance = clearance
+
+    def data(self) -> Dict:
+        return {
+            'edgeToken': self.edgeToken,
+            'edgeStart': list(self.edgeStart),
+            'edgeEnd': list(self.edgeEnd),
+            'corner': list(self.corner),
+            'start': list(self.start),
+            'end': list(self.end),
+            'radius': self.radius,
+            'angle': self.angle,
+            'clearance': self.clearance.data() if self.clearance else None
+        }
+
+    @classmethod
+    def fromData(cls, data: Dict) -> "CornerPlan":
+        clearance = data.get('clearance')
+        return CornerPlan(
+            data['edgeToken'], tuple(data['edgeStart']), tuple(data['edgeEnd']), tuple(data['corner']), tuple(data['start']), tuple(data['end']), data['radius'], data['angle'],
+            ClearanceBox.fromData(clearance) if clearance else None
+        )
+
+    def record(self) -> List:
+        """
+        the corner as it's stored with the feature: the edge token, the end points of the edge, the corner vector,
+        the radius and the angle, enough to place the corner again for another radius
+        """
+        return [self.edgeToken] + vecmath.rounded(list(self.edgeStart) + list(self.edgeEnd) + list(self.corner) + [self.radius, self.angle])
+
+    def key(self) -> Tuple:
+        return recordKey(self.record())
+
+
+class DogbonePlan(object):
+    """
+    the corners of one face that get a dogbone
+    """
+
+    def __init__(self, faceToken: str, bodyToken: str, corners: Optional[List[CornerPlan]] = None):
+        self.faceToken = faceToken
+        self.bodyToken = bodyToken
+        self.corners: List[CornerPlan] = corners if corners is not None else []
+
+    def data(self) -> Dict:
+        return {
+            'faceToken': self.faceToken,
+            'bodyToken': self.bodyToken,
+            'corners': [corner.data() for corner in self.corners]
+        }
+
+    def asJson(self) -> str:
+        return json.dumps(self.data())
+
+    @classmethod
+    def fromData(cls, data: Dict) -> "DogbonePlan":
+        return DogbonePlan(data['faceToken'], data['bodyToken'], [CornerPlan.fromData(corner) for corner in data['corners']])
+
+    @classmethod
+    def fromJson(cls, data: str) -> "DogbonePlan":
+        return cls.fromData(json.loads(data))
+
+
+def cornerVector(topology: BodyTopology, edge: int) -> Vector:
+    """
+    returns the direction halving the corner, pointing out of the material
+    """
+    return vecmath.normalize(vecmath.add(topology.faceNormal(topology.edgeFace1[edge]), topology.faceNormal(topology.edgeFace2[edge])))
+
+
+def clearanceBox(start: Vector, end: Vector, corner: Vector, angle: float, radius: float, centreDistance: float) -> Optional[ClearanceBox]:
+    """
+    returns the box that clears the path the tool takes to the dogbone hole of an acute corner,
+    None if the hole already reaches the sides. The box is as wide as the tool, as high as the edge
+    and reaches from the hole centre to the point where the tool meets the sides.
+    """
+    edgeHeight = vecmath.length(vecmath.subtract(end, start))
+    boxLength = radius / math.tan(angle / 2) - centreDistance
+
+    halfLength = vecmath.scale(corner, boxLength / 2)
+    if vecmath.length(halfLength) < 0.01:
+        return None
+
+    edgeDirection = vecmath.normalize(vecmath.subtract(end, start))
+    offset = vecmath.add(vecmath.scale(edgeDirection, edgeHeight / 2), halfLength)
+
+    return ClearanceBox(
+        vecmath.add(start, offset),
+        vecmath.normalize(halfLength),
+        # the corner vector rotated by 90° around the edge
+        vecmath.normalize(vecmath.cross(edgeDirection, corner)),
+        max(boxLength, 0.001),
+        radius * 2,
+        edgeHeight
+    )
+
+
+def placeCorner(edgeToken: str, edgeStart: Vector, edgeEnd: Vector, corner: Vector, angle: float, toolDiameter: float) -> CornerPlan:
+    """
+    plans the tool body of a corner edge for the tool diameter, edgeStart lies in the plane of the face
+    """
+    radius = toolDiameter / 2
+    centreDistance = radius
+
+    centre = vecmath.scale(corner, centreDistance)
+    startPoint, endPoint = vecmath.add(edgeStart, centre), vecmath.add(edgeEnd, centre)
+
+    clearance = None
+    if angle < math.pi / 2:
+        clearance = clearanceBox(startPoint, endPoint, corner, angle, radius, centreDistance)
+
+    return CornerPlan(edgeToken, edgeStart, edgeEnd, corner, startPoint, endPoint, radius, angle, clearance)
+
+
+def planCorner(topology: BodyTopology, face: int, edge: int, toolDiameter: float) -> CornerPlan:
+    """
+    plans the tool body of a corner edge that starts at the face
+    """
+    start, end = topology.edgeStart[edge], topology.edgeEnd[edge]
+    if start not in topology.faceVertices[face]:
+        start, end = end, start
+
+    return placeCorner(
+        topology.edgeTokens[edge], topology.vertexPoint(start), topology.vertexPoint(end), cornerVector(topology, edge),
+        topology.angleBetweenFaces(edge), toolDiameter
+    )
+
+
+def collinearSpans(corners: List[CornerPlan], tolerance=1e-6) -> List[List[int]]:
+    """
+    groups the indices of corners whose edges lie on the same line and touch or overlap, if they have the
+    same corner vector, radius and angle. Each group is one span that needs a single cylinder, this joins the
+    segments of a corner that is split by a step of a wall and the same edge reached from two faces.
+    The groups are ordered by their first index, which comes first in every group.
+    """
+    lines: Dict[Tuple, List[Tuple[float, float, int]]] = {}
+    for i, corner in enumerate(corners):
+        direction = vecmath.normalize(vecmath.subtract(corner.edgeEnd, corner.edgeStart))
+        # the same line has the same direction, whichever way its edges run
+        if next(value for value in direction if abs(value) > tolerance) < 0:
+            direction = vecmath.scale(direction, -1)
+        low, high = sorted((vecmath.dot(corner.edgeStart, direction), vecmath.dot(corner.edgeEnd, direction)))
+        foot = vecmath.subtract(corner.edgeStart, vecmath.scale(direction, vecmath.dot(corner.edgeStart, direction)))
+        key = tuple(vecmath.rounded(tuple(direction) + tuple(foot) + tuple(corner.corner) + (corner.radius, corner.angle)))
+        lines.setdefault(key, []).append((low, high, i))
+
+    spans: List[List[int]] = []
+    for segments in lines.values():
+        segments.sort()
+        span = [segments[0][2]]
+        reach = segments[0][1]
+        for low, high, i in segments[1:]:
+            if low <= reach + tolerance:
+                span.append(i)
+                reach = max(reach, high)
+            else:
+                spans.append(sorted(span))
+                span = [i]
+                reach = high
+        spans.append(sorted(span))
+
+    return sorted(spans)
+
+
+def mergePlans(plans: List[DogbonePlan], toolDiameter: float):
+    """
+    merges the collinear corners of the plans of one feature, each span is planned for the face of its first corner
+    """
+    owners = [plan for plan in plans for _ in plan.corners]
+    corners = [corner for plan in plans for corner in plan.corners]
+    for plan in plans:
+        plan.corners = []
+
+    for span in collinearSpans(corners):
+        owners[span[0]].corners.append(mergeSpan([corners[i] for i in span], toolDiameter))
+
+
+def mergeSpan(corners: List[CornerPlan], toolDiameter: float) -> CornerPlan:
+    """
+    places a corner along the whole span of the collinear corners, in the direction of the first one
+    """
+    first = corners[0]
+    if len(corners) == 1:
+        return first
+
+    direction = vecmath.subtract(first.edgeEnd, first.edgeStart)
+    points = [point for corner in corners for point in (corner.edgeStart, corner.edgeEnd)]
+    start = min(points, key=lambda point: vecmath.dot(point, direction))
+    end = max(points, key=lambda point: vecmath.dot(point, direction))
+    return placeCorner(first.edgeToken, start, end, first.corner, first.angle, toolDiameter)
+
+
+def planFace(topology: BodyTopology, face: int, toolDiameter: float, angleTolerance: float) -> DogbonePlan:
+    """
+    plans the tool bodies of all dogbone corners of the face, the tool diameter is in cm
+    """
+    plan = DogbonePlan(topology.faceTokens[face], topology.bodyToken)
+    if not topology.facePlanar[face]:
+        return plan
+
+    plan.corners = [planCorner(topology, face, edge, toolDiameter) for edge in topology.dogboneEdges(face, angleTolerance)]
+    return plan
+
+
+def planBody(topology: BodyTopology, faces: List[int], toolDiameter: float, angleTolerance: float) -> List[DogbonePlan]:
+    """
+    plans the given faces of one body, this is the unit of work of the serial and the parallel planning
+    """
+    return [planFace(topology, face, toolDiameter, angleTolerance) for face in faces]
+
+
+# edge token, edge start and end, corner vector, radius and angle
+RECORD_LENGTH = 12
+
+
+def recordKey(record: List) -> Tuple:
+    """
+    the geometry of a stored corner, corners with the same key have the same tool body
+    """
+    return tuple(record[1:])
+
+
+def isRecord(record: List) -> bool:
+    """
+    records of features created before the corner edges were stored can't be placed again
+    """
+    return len(record) == RECORD_LENGTH
+
+
+def replanCorner(record: List, toolDiameter: float) -> CornerPlan:
+    """
+    places a stored corner for another tool diameter, without looking at the topology
+    """
+    return placeCorner(record[0], tuple(record[1:4]), tuple(record[4:7]), tuple(record[7:10]), record[11], toolDiameter)
+
+
+def recordCovers(record: List, corner: CornerPlan, tolerance=1e-5) -> bool:
+    """
+    whether the stored corner cuts the edge of the corner, either it's the same edge or a span along the same line
+    with the same corner vector that contains it
+    """
+    if record[0] == corner.edgeToken:
+        return True
+    if not isRecord(record):
+        return False
+
+    vector = tuple(record[7:10])
+    if vecmath.length(vecmath.subtract(vector, corner.corner)) > tolerance:
+        return False
+
+    return recordContains(record, corner.edgeStart, tolerance) and recordContains(record, corner.edgeEnd, tolerance)
+
+
+def recordContains(record: List, point: Vector, tolerance=1e-5) -> bool:
+    """
+    whether the point lies on the edge, or the span of edges, of the stored corner
+    """
+    start, end = tuple(record[1:4]), tuple(record[4:7])
+    direction = vecmath.normalize(vecmath.subtract(end, start))
+    spanLength = vecmath.dot(vecmath.subtract(end, start), direction)
+    offset = vecmath.subtract(point, start)
+    along = vecmath.dot(offset, direction)
+    return (
+        -tolerance <= along <= spanLength + tolerance
+        and vecmath.length(vecmath.subtract(offset, vecmath.scale(direction, along))) <= tolerance
+    )
+
+
+class CornerRegistry(object):
+    """
+    the feature that cuts each corner edge within one create, keyed by the edge token, so a corner that is
+    found from the faces of several features is only cut by the first of them
+    """
+
+    def __init__(self):
+        self._owners: Dict[str, str] = {}
+
+    def removeOwned(self, plans: List[DogbonePlan]) -> Dict[str, str]:
+        """
+        removes the corners whose edges another feature already cuts from the plans,
+        returns the tokens of these edges with the token of the feature cutting them
+        """
+        shared: Dict[str, str] = {}
+        for plan in plans:
+            corners = []
+            for corner in plan.corners:
+                owner = self._owners.get(corner.edgeToken)
+                if owner is None:
+                    corners.append(corner)
+                else:
+                    shared[corner.edgeToken] = owner
+            plan.corners = corners
+        return shared
+
+    def claim(self, edgeTokens: List[str], owner: str):
+        for edgeToken in edgeTokens:
+            self._owners.setdefault(edgeToken, owner)
+
+
+class CornerPatch(object):
+    """
+    the changes to the bodies of a feature: kept bodies stay as they are, rebuilt bodies are replaced by the union
+    of their corners (or a copy of another body if no corner is left), added corners are unioned into the last kept body
+    """
+
+    def __init__(self):
+        self.kept: List[int] = []
+        self.rebuilt: Dict[int, List[CornerPlan]] = {}
+        self.added: List[CornerPlan] = []
+
+    def isEmpty(self) -> bool:
+        return len(self.rebuilt) == 0 and len(self.added) == 0
+
+
+def diffCorners(records: List[List[List]], corners: List[CornerPlan]) -> CornerPatch:
+    """
+    compares the stored corners of every body of a feature with the freshly planned corners. A body is kept if all
+    of its corners are still planned. A corner that isn't in a kept body goes to the rebuilt body that had the same
+    corner or edge, new corners go to the last rebuilt body, or are added if no body has to be rebuilt.
+    The corners of an edge that is shared by two faces are handed out to the bodies that had them in turn.
+    """
+    planned: Dict[Tuple, CornerPlan] = {}
+    for corner in corners:
+        planned.setdefault(corner.key(), corner)
+
+    patch = CornerPatch()
+    placed = set()
+    ownerByKey: Dict[Tuple, int] = {}
+    ownersByToken: Dict[str, List[int]] = {}
+
+    for body, bodyRecords in enumerate(records):
+        keys = [recordKey(record) for record in bodyRecords]
+        if len(keys) > 0 and all(key in planned for key in keys):
+            patch.kept.append(body)
+            placed.update(keys)
+            continue
+
+        patch.rebuilt[body] = []
+        for key, record in zip(keys, bodyRecords):
+            ownerByKey.setdefault(key, body)
+            ownersByToken.setdefault(record[0], []).append(body)
+
+    last = max(patch.rebuilt.keys()) if patch.rebuilt else None
+    for key, corner in planned.items():
+        if key in placed:
+            continue
+        body = ownerByKey.get(key)
+        if body is None:
+            owners = ownersByToken.get(corner.edgeToken)
+            body = (owners.pop(0) if len(owners) > 1 else owners[0]) if owners else last
+        if body is None:
+            patch.added.append(corner)
+        else:
+            patch.rebuilt[body].append(corner)
+
+    return patch
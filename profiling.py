@@ -0,0 +1,209 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from .log import logger
+
+# Timing spans and API call counters for create and update. Profiling is enabled by setting
+# DOGE_PROFILE, otherwise every span is the same object doing nothing.
+
+PROFILE_ENV = 'DOGE_PROFILE'
+
+SLOWEST_FEATURES = 5
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def describe(self, feature):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span(object):
+    __slots__ = ('_profiler', '_name', '_isStage', '_start')
+
+    def __init__(self, profiler: 'Profiler', name: str, isStage: bool):
+        self._profiler = profiler
+        self._name = name
+        self._isStage = isStage
+
+    def __enter__(self):
+        if self._isStage:
+            self._profiler._stages.append(self._name)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        duration = time.perf_counter() - self._start
+        profiler = self._profiler
+        if self._isStage:
+            profiler._stages.pop()
+            profiler._addStage(self._name, duration)
+        else:
+            profiler._addCall(self._name, duration)
+        return False
+
+
+class FeatureRecord(object):
+    def __init__(self):
+        self.name = ''
+        self.index = -1
+        self.seconds = 0.0
+        self.stages: Dict[str, float] = {}
+
+    def describe(self, feature):
+        self.name = feature.name
+        self.index = feature.timelineObject.index
+
+
+class _FeatureSpan(object):
+    __slots__ = ('_profiler', '_record', '_start')
+
+    def __init__(self, profiler: 'Profiler', record: FeatureRecord):
+        self._profiler = profiler
+        self._record = record
+
+    def __enter__(self):
+        self._profiler._feature = self._record
+        self._start = time.perf_counter()
+        return self._record
+
+    def __exit__(self, *args):
+        self._record.seconds = time.perf_counter() - self._start
+        # a create that didn't produce a feature isn't listed
+        if self._record.index >= 0:
+            self._profiler._features.append(self._record)
+        self._profiler._feature = None
+        return False
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    nearest rank percentile of the values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Profiler(object):
+    """
+    Collects the time of stages (e.g. edge discovery, unions, timeline rolls) and of single API calls, both
+    overall and per dogbone feature. API calls are counted per enclosing stage.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.operation = ''
+        self._start = 0.0
+        self._stages: List[str] = []
+        self._feature: Optional[FeatureRecord] = None
+        self._features: List[FeatureRecord] = []
+        self._stageTotals: Dict[str, Tuple[int, float]] = {}
+        self._calls: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def start(self, operation: str):
+        self.enabled = bool(os.environ.get(PROFILE_ENV))
+        self.operation = operation
+        self._stages.clear()
+        self._feature = None
+        self._features.clear()
+        self._stageTotals.clear()
+        self._calls.clear()
+        self._start = time.perf_counter()
+
+    def stage(self, name: str):
+        """
+        times a stage of the pipeline
+        """
+        return _Span(self, name, True) if self.enabled else _NO_SPAN
+
+    def call(self, name: str):
+        """
+        times and counts a single API call
+        """
+        return _Span(self, name, False) if self.enabled else _NO_SPAN
+
+    def feature(self, feature=None):
+        """
+        attributes the spans to one dogbone feature, the feature can also be described once it exists
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        record = FeatureRecord()
+        if feature is not None:
+            record.describe(feature)
+        return _FeatureSpan(self, record)
+
+    def _addStage(self, name: str, duration: float):
+        count, total = self._stageTotals.get(name, (0, 0.0))
+        self._stageTotals[name] = (count + 1, total + duration)
+        if self._feature is not None:
+            self._feature.stages[name] = self._feature.stages.get(name, 0.0) + duration
+
+    def _addCall(self, name: str, duration: float):
+        key = (self._stages[-1] if self._stages else '', name)
+        count, total = self._calls.get(key, (0, 0.0))
+        self._calls[key] = (count + 1, total + duration)
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self._start
+        lines = [f"Profile of {self.operation}: {len(self._features)} features in {total * 1000:.1f} ms"]
+
+        lines.append(f"{'stage':<16}{'spans':>7}{'total ms':>11}{'p50 ms':>9}{'p95 ms':>9}  API calls")
+        for name, (count, seconds) in self._stageTotals.items():
+            perFeature = [feature.stages[name] for feature in self._features if name in feature.stages]
+            calls = ', '.join(
+                f"{call} {callCount}x {callSeconds * 1000:.1f} ms"
+                for (stage, call), (callCount, callSeconds) in self._calls.items() if stage == name
+            )
+            lines.append(
+                f"{name:<16}{count:>7}{seconds * 1000:>11.1f}{percentile(perFeature, 0.5) * 1000:>9.2f}"
+                f"{percentile(perFeature, 0.95) * 1000:>9.2f}  {calls}"
+            )
+
+        outside = [f"{call} {count}x" for (stage, call), (count, _) in self._calls.items() if stage == '']
+        if outside:
+            lines.append(f"API calls outside of stages: {', '.join(outside)}")
+
+        if self._features:
+            seconds = [feature.seconds for feature in self._features]
+            lines.append(f"per feature: p50 {percentile(seconds, 0.5) * 1000:.2f} ms, p95 {percentile(seconds, 0.95) * 1000:.2f} ms")
+            slowest = sorted(self._features, key=lambda feature: feature.seconds, reverse=True)[:SLOWEST_FEATURES]
+            lines.append('slowest: ' + ', '.join(
+                f"'{feature.name}' [{feature.index}] {feature.seconds * 1000:.2f} ms" for feature in slowest
+            ))
+
+        return '\n'.join(lines)
+
+    def finish(self):
+        if self.enabled:
+            logger.info(self.summary())
+        self.enabled = False
+
+
+profiler = Profiler()
+
+
+@contextmanager
+def profile(operation: str):
+    """
+    profiles a create or update when DOGE_PROFILE is set and logs the summary afterwards
+    """
+    profiler.start(operation)
+    try:
+        yield profiler
+    finally:
+        profiler.finish()
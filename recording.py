@@ -0,0 +1,458 @@
+import gzip
+import importlib
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .log import logger
+
+# Records the Fusion API calls of a create or update to a trace file and replays them without Fusion.
+#
+# A trace is a gzip compressed file with one JSON array per line:
+#   ["o", operation, data]                    an operation of the add-in, e.g. a create with its inputs
+#   ["g", object, name, result]               an attribute read
+#   ["s", object, name, value]                an attribute write
+#   ["c", object, name, arguments, result]    a method call
+# API objects are referenced as {"ref": id}, tuples as {"tuple": [...]}, exceptions as {"error": message}
+# and attributes an object doesn't have as {"missing": message}.
+# The id of an object is its entityToken if it has one, so the same entity keeps its id across calls.
+
+TRACE_ENV = 'DOGE_TRACE'
+
+CREATE = 'create'
+UPDATE = 'update'
+
+# static entry points of the API, every object the add-in touches is reached from one of these
+ENTRY_POINTS = [
+    ('adsk.core', 'Application', 'get'),
+    ('adsk.fusion', 'TemporaryBRepManager', 'get'),
+    ('adsk.core', 'ObjectCollection', 'create'),
+    ('adsk.core', 'Point3D', 'create'),
+    ('adsk.core', 'Vector3D', 'create'),
+    ('adsk.core', 'Matrix3D', 'create'),
+    ('adsk.core', 'OrientedBoundingBox3D', 'create'),
+]
+
+_PRIMITIVES = (type(None), bool, int, float, str)
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _isMethod(value) -> bool:
+    return inspect.ismethod(value) or inspect.isfunction(value) or inspect.isbuiltin(value)
+
+
+def _arguments(encode, args: Tuple, kwargs: Optional[Dict]) -> List:
+    arguments = encode(list(args))
+    if kwargs:
+        arguments.append({'kwargs': {key: encode(value) for key, value in kwargs.items()}})
+    return arguments
+
+
+def _key(arguments) -> str:
+    return json.dumps(arguments, separators=(',', ':'), sort_keys=True)
+
+
+class _EntryPoints(object):
+    """
+    replaces the static entry points and the API objects geometry keeps at module level while a
+    recording or replay is active
+    """
+
+    def __init__(self, wrap):
+        self._wrap = wrap
+        self._originals: List[Tuple[Any, str, Any]] = []
+
+    def _replace(self, owner, name: str, value):
+        # the class attribute itself, i.e. the staticmethod and not the function it wraps
+        self._originals.append((owner, name, inspect.getattr_static(owner, name)))
+        setattr(owner, name, value)
+
+    def install(self):
+        for moduleName, className, methodName in ENTRY_POINTS:
+            cls = getattr(importlib.import_module(moduleName), className, None)
+            if cls is None:
+                continue
+            self._replace(cls, methodName, staticmethod(self._wrap(f'{moduleName}.{className}', methodName, getattr(cls, methodName))))
+
+        from . import geometry
+        from . import options
+        from . import toolcache
+
+        app = importlib.import_module('adsk.core').Application.get()
+        self._replace(geometry, '_app', app)
+        self._replace(geometry, '_design', app.activeProduct)
+        self._replace(geometry, '_rootComp', geometry._design.rootComponent)
+        # evaluated expressions and the templates of the tool bodies have to go through the entry points as well
+        options.expressionCache.invalidate()
+        toolcache.toolBodyCache.clear()
+
+    def uninstall(self):
+        from . import options
+        from . import toolcache
+
+        for owner, name, value in reversed(self._originals):
+            setattr(owner, name, value)
+        self._originals.clear()
+        options.expressionCache.invalidate()
+        toolcache.toolBodyCache.clear()
+
+
+# Recording ---------------------------------------------------------------------------------------------------------
+
+class _RecordedObject(object):
+    """
+    forwards everything to the wrapped API object and records it
+    """
+
+    __slots__ = ('_recorder', '_target', '_id')
+
+    def __init__(self, recorder: 'Recorder', target, objectId: str):
+        object.__setattr__(self, '_recorder', recorder)
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_id', objectId)
+
+    def __getattr__(self, name):
+        try:
+            value = getattr(self._target, name)
+        except AttributeError as e:
+            # getattr() with a default is used to probe for optional attributes
+            self._recorder.write(['g', self._id, name, {'missing': str(e)}])
+            raise
+        if _isMethod(value):
+            return lambda *args, **kwargs: self._recorder.call(self._id, name, value, args, kwargs)
+        return self._recorder.result(['g', self._id, name], value)
+
+    def __setattr__(self, name, value):
+        self._recorder.write(['s', self._id, name, self._recorder.encode(value)])
+        setattr(self._target, name, self._recorder.unwrap(value))
+
+    def _call(self, name, *args):
+        return self._recorder.call(self._id, name, getattr(self._target, name), args)
+
+    def __iter__(self):
+        return iter(self._recorder.call(self._id, '__iter__', lambda: list(self._target), ()))
+
+    def __len__(self):
+        return self._call('__len__')
+
+    def __getitem__(self, index):
+        return self._call('__getitem__', index)
+
+    def __contains__(self, item):
+        return self._recorder.call(self._id, '__contains__', lambda other: other in self._target, (item,))
+
+    def __bool__(self):
+        return self._recorder.call(self._id, '__bool__', lambda: bool(self._target), ())
+
+    def __eq__(self, other):
+        if isinstance(other, _RecordedObject) and other._id == self._id:
+            return True
+        return self._recorder.call(self._id, '__eq__', lambda value: self._target == value, (other,))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._id)
+
+    def __repr__(self):
+        return f'<recorded {self._id}>'
+
+
+class Recorder(object):
+    def __init__(self, path: str):
+        self.path = path
+        self.events = 0
+        self._file = gzip.open(path, 'wt', encoding='UTF-8')
+        self._objects = 0
+        self._entryPoints = _EntryPoints(self._entryPoint)
+
+    def _entryPoint(self, objectId: str, name: str, function):
+        return lambda *args, **kwargs: self.call(objectId, name, function, args, kwargs)
+
+    def write(self, event: List):
+        self._file.write(json.dumps(event, separators=(',', ':')))
+        self._file.write('\n')
+        self.events += 1
+
+    def _objectId(self, target) -> str:
+        try:
+            token = target.entityToken
+        except Exception:
+            token = None
+        if token:
+            return 't:' + token
+        self._objects += 1
+        return '#' + str(self._objects)
+
+    def wrap(self, value):
+        if isinstance(value, (_PRIMITIVES, _RecordedObject)):
+            return value
+        if isinstance(value, list):
+            return [self.wrap(item) for item in value]
+        if isinstance(value, tuple):
+            return tuple(self.wrap(item) for item in value)
+        return _RecordedObject(self, value, self._objectId(value))
+
+    def unwrap(self, value):
+        if isinstance(value, _RecordedObject):
+            return value._target
+        if isinstance(value, list):
+            return [self.unwrap(item) for item in value]
+        if isinstance(value, tuple):
+            return tuple(self.unwrap(item) for item in value)
+        return value
+
+    def encode(self, value):
+        if isinstance(value, _PRIMITIVES):
+            return value
+        if isinstance(value, _RecordedObject):
+            return {'ref': value._id}
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        if isinstance(value, tuple):
+            return {'tuple': [self.encode(item) for item in value]}
+        # an API object that didn't come through the recording
+        return {'value': repr(value)}
+
+    def result(self, event: List, value):
+        value = self.wrap(value)
+        self.write(event + [self.encode(value)])
+        return value
+
+    def call(self, objectId: str, name: str, function, args: Tuple, kwargs: Optional[Dict] = None):
+        event = ['c', objectId, name, _arguments(self.encode, args, kwargs)]
+        try:
+            value = function(*self.unwrap(args), **{key: self.unwrap(value) for key, value in (kwargs or {}).items()})
+        except Exception as e:
+            self.write(event + [{'error': str(e)}])
+            raise
+        return self.result(event, value)
+
+    def operation(self, name: str, **data):
+        self.write(['o', name, data])
+
+    def recordInputs(self, inputs):
+        """
+        returns a copy of the inputs whose faces are recorded
+        """
+        from .options import DogeboneFeatureInput
+
+        recorded = DogeboneFeatureInput.fromJson(inputs.asJson())
+        recorded.faces = {key: self.wrap(face) for key, face in inputs.faces.items()}
+        self.operation(CREATE, inputs=inputs.asJson(), faces=[[key, self.encode(face)] for key, face in recorded.faces.items()])
+        return recorded
+
+    def start(self):
+        self._entryPoints.install()
+
+    def stop(self):
+        self._entryPoints.uninstall()
+        self._file.close()
+
+
+def tracePath(operation: str) -> Optional[str]:
+    """
+    returns the file to record the operation to, when recording is enabled by the DOGE_TRACE directory.
+    The name has the time in milliseconds, and a counter if a trace of the same millisecond exists.
+    """
+    directory = os.environ.get(TRACE_ENV)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+    path = os.path.join(directory, f"doge-{operation}-{stamp}.trace.gz")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"doge-{operation}-{stamp}-{counter}.trace.gz")
+        counter += 1
+    return path
+
+
+@contextmanager
+def record(operation: str, **data) -> Iterator[Optional[Recorder]]:
+    """
+    records the API calls made within the context if DOGE_TRACE is set, yields None otherwise
+    """
+    path = tracePath(operation)
+    if path is None:
+        yield None
+        return
+
+    recorder = Recorder(path)
+    recorder.start()
+    try:
+        if operation != CREATE:
+            recorder.operation(operation, **data)
+        yield recorder
+    finally:
+        recorder.stop()
+        logger.info("Recorded %d API events to %s", recorder.events, path)
+
+
+# Replay ------------------------------------------------------------------------------------------------------------
+
+class _ReplayedObject(object):
+    """
+    answers attribute reads and method calls with the results of the trace
+    """
+
+    __slots__ = ('_replayer', '_id')
+
+    def __init__(self, replayer: 'Replayer', objectId: str):
+        object.__setattr__(self, '_replayer', replayer)
+        object.__setattr__(self, '_id', objectId)
+
+    def __getattr__(self, name):
+        replayer = self._replayer
+        if (self._id, name) in replayer.attributes:
+            return replayer.lookup(('g', self._id, name))
+        if (self._id, name) in replayer.methods:
+            return lambda *args, **kwargs: replayer.call(self._id, name, args, kwargs)
+        raise ReplayError(f'{self._id}.{name} was not recorded')
+
+    def __setattr__(self, name, value):
+        self._replayer.writes += 1
+
+    def __iter__(self):
+        return iter(self._replayer.call(self._id, '__iter__', ()))
+
+    def __len__(self):
+        return self._replayer.call(self._id, '__len__', ())
+
+    def __getitem__(self, index):
+        return self._replayer.call(self._id, '__getitem__', (index,))
+
+    def __contains__(self, item):
+        return self._replayer.call(self._id, '__contains__', (item,))
+
+    def __bool__(self):
+        return self._replayer.call(self._id, '__bool__', ())
+
+    def __eq__(self, other):
+        if isinstance(other, _ReplayedObject) and other._id == self._id:
+            return True
+        return self._replayer.call(self._id, '__eq__', (other,))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self._id)
+
+    def __repr__(self):
+        return f'<replayed {self._id}>'
+
+
+class Replayer(object):
+    """
+    Runs the operations of a trace against the recorded results instead of Fusion.
+
+    Calls are looked up by object, name and arguments rather than by position, so the add-in may
+    change the order of its calls. A call that is made more often than it was recorded gets the last
+    recorded result, a call that was never recorded raises a ReplayError.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.operations: List[Tuple[str, Dict]] = []
+        self.attributes = set()
+        self.methods = set()
+        self.replayed = 0
+        self.writes = 0
+        self._results: Dict[Tuple, List] = {}
+        self._positions: Dict[Tuple, int] = {}
+        self._objects: Dict[str, _ReplayedObject] = {}
+
+        with gzip.open(path, 'rt', encoding='UTF-8') as file:
+            for line in file:
+                self._read(json.loads(line))
+
+        self._entryPoints = _EntryPoints(lambda objectId, name, function: lambda *args, **kwargs: self.call(objectId, name, args, kwargs))
+
+    def _read(self, event: List):
+        kind = event[0]
+        if kind == 'o':
+            self.operations.append((event[1], event[2]))
+        elif kind == 'g':
+            self.attributes.add((event[1], event[2]))
+            self._results.setdefault(('g', event[1], event[2]), []).append(event[3])
+        elif kind == 'c':
+            self.methods.add((event[1], event[2]))
+            self._results.setdefault(('c', event[1], event[2], _key(event[3])), []).append(event[4])
+
+    def object(self, objectId: str) -> _ReplayedObject:
+        replayed = self._objects.get(objectId)
+        if replayed is None:
+            replayed = _ReplayedObject(self, objectId)
+            self._objects[objectId] = replayed
+        return replayed
+
+    def encode(self, value):
+        if isinstance(value, _PRIMITIVES):
+            return value
+        if isinstance(value, _ReplayedObject):
+            return {'ref': value._id}
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        if isinstance(value, tuple):
+            return {'tuple': [self.encode(item) for item in value]}
+        return {'value': repr(value)}
+
+    def decode(self, value):
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if isinstance(value, dict):
+            if 'ref' in value:
+                return self.object(value['ref'])
+            if 'tuple' in value:
+                return tuple(self.decode(item) for item in value['tuple'])
+            if 'error' in value:
+                raise Exception(value['error'])
+            if 'missing' in value:
+                raise AttributeError(value['missing'])
+        return value
+
+    def lookup(self, key: Tuple):
+        results = self._results.get(key)
+        if results is None:
+            raise ReplayError(f'{key} was not recorded')
+        position = self._positions.get(key, 0)
+        self._positions[key] = position + 1
+        self.replayed += 1
+        return self.decode(results[min(position, len(results) - 1)])
+
+    def call(self, objectId: str, name: str, args: Tuple, kwargs: Optional[Dict] = None):
+        return self.lookup(('c', objectId, name, _key(_arguments(self.encode, args, kwargs))))
+
+    def run(self):
+        """
+        replays every recorded operation
+        """
+        from . import Doge
+        from . import geometry
+        from .options import DogeboneFeatureInput
+
+        self._entryPoints.install()
+        try:
+            for operation, data in self.operations:
+                if operation == CREATE:
+                    inputs = DogeboneFeatureInput.fromJson(data['inputs'])
+                    inputs.faces = {key: self.decode(face) for key, face in data['faces']}
+                    geometry.createDogeBones(inputs)
+                elif operation == UPDATE:
+                    args = SimpleNamespace(command=None)
+                    getattr(Doge, data['command'])(args).doExecute()
+                else:
+                    raise ReplayError(f'Unknown operation {operation}')
+        finally:
+            self._entryPoints.uninstall()
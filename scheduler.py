@@ -0,0 +1,74 @@
+import adsk.core
+import adsk.fusion
+
+from .log import logger
+from .profiling import profiler
+
+
+class UpdateScheduler(object):
+    """
+    Moves the timeline marker through the features of an update in strictly increasing timeline order.
+
+    The marker is rolled back once to the first feature and afterward only moved forward as far as
+    the next feature needs it, so the history is replayed about once instead of once per feature.
+    finish() restores the marker and reports the moves that were performed and avoided.
+    """
+
+    def __init__(self, timeline: adsk.fusion.Timeline):
+        self._timeline = timeline
+        self._startPosition = timeline.markerPosition
+        self._lastIndex = -1
+
+        self.features = 0
+        self.moves = 0
+        self.replayed = 0
+        # what replaying the rest of the timeline after every single feature would cost
+        self._partialReplays = 0
+
+    def rollTo(self, obj: adsk.fusion.TimelineObject) -> bool:
+        """
+        places the marker right after the object, the same position obj.rollTo(False) would roll to
+        """
+        index = obj.index
+        if index <= self._lastIndex:
+            raise Exception('Features have to be updated in timeline order')
+        self._lastIndex = index
+        self.features += 1
+        self._partialReplays += max(0, self._startPosition - index - 1)
+
+        position = self._timeline.markerPosition
+        target = index + 1
+        if position == target:
+            return True
+
+        with profiler.call('markerPosition'):
+            self._timeline.markerPosition = target
+        if self._timeline.markerPosition != target:
+            return False
+
+        self.moves += 1
+        if target > position:
+            self.replayed += target - position
+        return True
+
+    @property
+    def avoided(self) -> int:
+        """
+        timeline objects that weren't recomputed, compared to N partial replays: rolling back to
+        every feature and replaying the timeline after it up to the original marker position
+        """
+        return max(0, self._partialReplays - self.replayed)
+
+    def finish(self):
+        position = self._timeline.markerPosition
+        if position != self._startPosition:
+            with profiler.call('markerPosition'):
+                self._timeline.markerPosition = self._startPosition
+            self.moves += 1
+            if self._startPosition > position:
+                self.replayed += self._startPosition - position
+
+        logger.info(
+            "Timeline: %d marker moves for %d features, %d timeline objects replayed, %d recomputes avoided",
+            self.moves, self.features, self.replayed, self.avoided
+        )
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import adsk.fusion
+
+# Most corners of a part share the tool radius and the depth of their pocket. Their tool bodies are copies
+# of a few canonical bodies, moved into place with a transform instead of being created from scratch.
+
+DEFAULT_CAPACITY = 64
+
+# lengths are cm, angles radians
+LENGTH_QUANTUM = 1e-5
+ANGLE_QUANTUM = 1e-6
+
+TemplateKey = Tuple[int, int, Optional[int]]
+
+
+def templateKey(radius: float, length: float, angle: Optional[float]) -> TemplateKey:
+    """
+    quantizes the dimensions of a tool body, the angle only matters for corners with a clearance box
+    """
+    return (
+        round(radius / LENGTH_QUANTUM),
+        round(length / LENGTH_QUANTUM),
+        round(angle / ANGLE_QUANTUM) if angle is not None else None
+    )
+
+
+class ToolBodyCache(object):
+    """
+    Keeps the least recently used canonical tool bodies. The bodies are templates, they're never modified,
+    the caller copies them. Hits and misses are counted over the lifetime of the cache.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._bodies: 'OrderedDict[TemplateKey, adsk.fusion.BRepBody]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: TemplateKey, create: Callable[[], adsk.fusion.BRepBody]) -> adsk.fusion.BRepBody:
+        body = self._bodies.get(key)
+        if body is not None:
+            self.hits += 1
+            self._bodies.move_to_end(key)
+            return body
+
+        self.misses += 1
+        body = create()
+        self._bodies[key] = body
+        if len(self._bodies) > self.capacity:
+            self._bodies.popitem(last=False)
+            self.evictions += 1
+        return body
+
+    def clear(self):
+        """
+        drops the templates, they belong to the TemporaryBRepManager that created them
+        """
+        self._bodies.clear()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def hitRate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.hitRate() * 100:.1f}% hits ({self.hits} hits, {self.misses} misses, "
+            f"{self.evictions} evictions, {len(self._bodies)} templates)"
+        )
+
+
+toolBodyCache = ToolBodyCache()
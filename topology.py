@@ -0,0 +1,265 @@
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from . import vecmath
+from .classification import classifyCorners, parallelToNormal
+from .vecmath import Vector
+
+# The topology tables don't depend on adsk, they're filled by geometry.snapshotBody
+# once per operation and queried afterward without touching the live B-Rep.
+
+NO_FACE = -1
+
+
+class Adjacency(object):
+    """
+    compressed adjacency lists, row i is indices[offsets[i]:offsets[i + 1]]
+    """
+
+    def __init__(self, rows: Sequence[Sequence[int]]):
+        self.offsets = array('l', [0])
+        self.indices = array('l')
+        for row in rows:
+            self.indices.extend(row)
+            self.offsets.append(len(self.indices))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> array:
+        return self.indices[self.offsets[row]:self.offsets[row + 1]]
+
+
+class BodyTopology(object):
+    """
+    Array-backed snapshot of the faces, edges and vertices of a single body.
+
+    Faces, edges and vertices are addressed by their index into the tables, the
+    entityToken of each entity maps to its index.
+    """
+
+    def __init__(self, bodyToken: str):
+        self.bodyToken = bodyToken
+
+        self.faceTokens: List[str] = []
+        self.faceIndex: Dict[str, int] = {}
+        self.facePlanar = array('b')
+        # 3 components per face, only meaningful for planar faces
+        self.faceNormals = array('d')
+
+        self.edgeTokens: List[str] = []
+        self.edgeIndex: Dict[str, int] = {}
+        # valid, not degenerate and a line
+        self.edgeIsLine = array('b')
+        self.edgeStart = array('l')
+        self.edgeEnd = array('l')
+        self.edgeFace1 = array('l')
+        self.edgeFace2 = array('l')
+        # whether the co-edge of face1 runs opposite to the edge
+        self.edgeOpposed1 = array('b')
+
+        self.vertexTokens: List[str] = []
+        self.vertexIndex: Dict[str, int] = {}
+        # 3 components per vertex
+        self.vertexPoints = array('d')
+
+        self.faceEdges = Adjacency([])
+        self.faceVertices = Adjacency([])
+        self.vertexEdges = Adjacency([])
+
+        self._cornerAngles: Optional[List[float]] = None
+
+    def addFace(self, token: str, isPlanar: bool, normal: Optional[Vector]) -> int:
+        index = len(self.faceTokens)
+        self.faceTokens.append(token)
+        self.faceIndex[token] = index
+        self.facePlanar.append(1 if isPlanar else 0)
+        self.faceNormals.extend(normal if normal else (0.0, 0.0, 0.0))
+        return index
+
+    def addVertex(self, token: str, point: Vector) -> int:
+        index = self.vertexIndex.get(token)
+        if index is not None:
+            return index
+
+        index = len(self.vertexTokens)
+        self.vertexTokens.append(token)
+        self.vertexIndex[token] = index
+        self.vertexPoints.extend(point)
+        return index
+
+    def addEdge(self, token: str, isLine: bool, start: int, end: int) -> int:
+        index = len(self.edgeTokens)
+        self.edgeTokens.append(token)
+        self.edgeIndex[token] = index
+        self.edgeIsLine.append(1 if isLine else 0)
+        self.edgeStart.append(start)
+        self.edgeEnd.append(end)
+        self.edgeFace1.append(NO_FACE)
+        self.edgeFace2.append(NO_FACE)
+        self.edgeOpposed1.append(0)
+        return index
+
+    def addCoEdge(self, edge: int, face: int, isOpposedToEdge: bool):
+        if self.edgeFace1[edge] == NO_FACE:
+            self.edgeFace1[edge] = face
+            self.edgeOpposed1[edge] = 1 if isOpposedToEdge else 0
+        elif self.edgeFace2[edge] == NO_FACE and self.edgeFace1[edge] != face:
+            self.edgeFace2[edge] = face
+
+    def finish(self):
+        """
+        builds the adjacency tables, has to be called once all faces, edges and co-edges are added
+        """
+        faceEdges: List[List[int]] = [[] for _ in self.faceTokens]
+        faceVertices: List[Dict[int, None]] = [{} for _ in self.faceTokens]
+        vertexEdges: List[List[int]] = [[] for _ in self.vertexTokens]
+
+        for edge in range(len(self.edgeTokens)):
+            start, end = self.edgeStart[edge], self.edgeEnd[edge]
+            vertexEdges[start].append(edge)
+            if end != start:
+                vertexEdges[end].append(edge)
+
+            for face in (self.edgeFace1[edge], self.edgeFace2[edge]):
+                if face == NO_FACE:
+                    continue
+                faceEdges[face].append(edge)
+                faceVertices[face][start] = None
+                faceVertices[face][end] = None
+
+        self.faceEdges = Adjacency(faceEdges)
+        self.faceVertices = Adjacency(faceVertices)
+        self.vertexEdges = Adjacency(vertexEdges)
+
+    def faceNormal(self, face: int) -> Vector:
+        i = face * 3
+        normals = self.faceNormals
+        return normals[i], normals[i + 1], normals[i + 2]
+
+    def vertexPoint(self, vertex: int) -> Vector:
+        i = vertex * 3
+        points = self.vertexPoints
+        return points[i], points[i + 1], points[i + 2]
+
+    def edgeVector(self, edge: int, refVertices: Optional[Set[int]] = None, reverse=False) -> Vector:
+        """
+        returns vector of the edge (not normalised!)
+        if the vertices of a reference face are supplied - returns vector pointing out from face vertex
+        """
+        start, end = self.edgeStart[edge], self.edgeEnd[edge]
+        if refVertices is not None:
+            reverse = end in refVertices
+        if reverse:
+            start, end = end, start
+        return vecmath.subtract(self.vertexPoint(end), self.vertexPoint(start))
+
+    def cornerInputs(self) -> Tuple[array, array, array, array, array]:
+        """
+        the edge vectors, co-edge directions, face normals and validity classifyCorners takes for all edges
+        """
+        edgeVectors = array('d')
+        normals1 = array('d')
+        normals2 = array('d')
+        valid = array('b')
+        for edge in range(len(self.edgeTokens)):
+            face1, face2 = self.edgeFace1[edge], self.edgeFace2[edge]
+            isValid = face1 != NO_FACE and face2 != NO_FACE and self.facePlanar[face1] and self.facePlanar[face2]
+            valid.append(1 if isValid else 0)
+            edgeVectors.extend(self.edgeVector(edge))
+            normals1.extend(self.faceNormal(face1) if isValid else (0.0, 0.0, 0.0))
+            normals2.extend(self.faceNormal(face2) if isValid else (0.0, 0.0, 0.0))
+
+        return edgeVectors, self.edgeOpposed1, normals1, normals2, valid
+
+    @property
+    def cornerAngles(self) -> List[float]:
+        """
+        radian angle between the two faces of every edge, classified for all edges of the body at once
+        """
+        if self._cornerAngles is None:
+            self._cornerAngles = classifyCorners(*self.cornerInputs())
+        return self._cornerAngles
+
+    def angleBetweenFaces(self, edge: int) -> float:
+        """
+        returns radian angle between the faces of the edge, see classification.classifyCorners
+        """
+        return self.cornerAngles[edge]
+
+    def candidateEdges(self, face: int) -> List[int]:
+        """
+        returns the edges touching the vertices of the face, that are not edges of the face itself
+        """
+        faceEdges = set(self.faceEdges[face])
+        candidates: Dict[int, None] = {}
+        for vertex in self.faceVertices[face]:
+            for edge in self.vertexEdges[vertex]:
+                if edge not in faceEdges:
+                    candidates[edge] = None
+        return list(candidates)
+
+    def dogboneEdges(self, face: int, angleTolerance: float) -> List[int]:
+        """
+        returns the concave 90° corner edges starting at the face and running parallel to the face normal, away from it
+        """
+        faceVertices = set(self.faceVertices[face])
+        candidates = [edge for edge in self.candidateEdges(face) if self.edgeIsLine[edge]]
+
+        directions = array('d')
+        for edge in candidates:
+            directions.extend(self.edgeVector(edge, refVertices=faceVertices))
+        parallel, codirectional = parallelToNormal(directions, self.faceNormal(face), angleTolerance)
+
+        angles = self.cornerAngles
+        edges: List[int] = []
+        for i, edge in enumerate(candidates):
+            if not parallel[i] or codirectional[i]:
+                continue
+
+            face1, face2 = self.edgeFace1[edge], self.edgeFace2[edge]
+            if face1 == NO_FACE or face2 == NO_FACE or not self.facePlanar[face1] or not self.facePlanar[face2]:
+                continue
+
+            if abs(angles[edge] * 180 / math.pi - 90) > 0.001:
+                continue
+
+            edges.append(edge)
+        return edges
+
+    def dogboneFaces(self, axis: Vector, angleTolerance: float) -> List[int]:
+        """
+        returns the planar faces facing along the axis that have dogbone edges, i.e. concave 90° corner edges
+        running against the axis from a vertex of the face. Every edge is visited once, instead of searching
+        the edges around each face.
+        """
+        _, facing = parallelToNormal(self.faceNormals, axis, angleTolerance)
+
+        lines = [edge for edge in range(len(self.edgeTokens)) if self.edgeIsLine[edge]]
+        directions = array('d')
+        for edge in lines:
+            directions.extend(self.edgeVector(edge))
+        parallel, codirectional = parallelToNormal(directions, axis, angleTolerance)
+
+        angles = self.cornerAngles
+        faces: Set[int] = set()
+        for i, edge in enumerate(lines):
+            if not parallel[i]:
+                continue
+
+            face1, face2 = self.edgeFace1[edge], self.edgeFace2[edge]
+            if face1 == NO_FACE or face2 == NO_FACE or not self.facePlanar[face1] or not self.facePlanar[face2]:
+                continue
+
+            if abs(angles[edge] * 180 / math.pi - 90) > 0.001:
+                continue
+
+            # the corner starts at the vertex it runs away from against the axis
+            vertex = self.edgeEnd[edge] if codirectional[i] else self.edgeStart[edge]
+            for other in self.vertexEdges[vertex]:
+                for face in (self.edgeFace1[other], self.edgeFace2[other]):
+                    if face != NO_FACE and self.facePlanar[face] and facing[face]:
+                        faces.add(face)
+
+        return sorted(faces)
@@ -1,13 +1,18 @@
-from typing import cast
+from typing import Dict, List, Optional, cast
 
 import adsk.core
 import adsk.fusion
 
+from . import geometry
 from .options import DogeboneFeatureInput, DogeboneType, FusionExpression
 
 
 class Input:
     FACE_SELECT = 'faceSelect'
+    SELECT_BODIES = 'selectBodies'
+    BODY_SELECT = 'bodySelect'
+    TOOL_AXIS = 'toolAxis'
+    CORNER_COUNT = 'cornerCount'
     DOGBONE_TYPE = 'dogeboneType'
     TOOL_DIAMETER = 'toolDiameter'
 
@@ -18,6 +23,9 @@ class Input:
 
 DogboneTypeFromIndex = [DogeboneType.NORMAL, DogeboneType.MINIMAL, DogeboneType.MORTISE]
 
+# the direction the tool comes from, in the coordinates of the body's component
+ToolAxes = [('+Z', (0.0, 0.0, 1.0)), ('-Z', (0.0, 0.0, -1.0)), ('+Y', (0.0, 1.0, 0.0)), ('-Y', (0.0, -1.0, 0.0)), ('+X', (1.0, 0.0, 0.0)), ('-X', (-1.0, 0.0, 0.0))]
+
 
 class DogeBoneUI(object):
 
@@ -34,6 +42,19 @@ class DogeBoneUI(object):
         self._inputFaces.addSelectionFilter(adsk.core.SelectionCommandInput.PlanarFaces)
         self._inputFaces.setSelectionLimits(1, 0)
 
+        self._inputSelectBodies = inputs.addBoolValueInput(Input.SELECT_BODIES, 'Select Bodies', True, '', False)
+        self._inputSelectBodies.tooltip = 'Finds the faces with dogbone corners on whole bodies'
+
+        self._inputBodies = inputs.addSelectionInput(
+            Input.BODY_SELECT, 'Body',
+            'Select a body to apply dogbones to all faces facing the tool axis')
+        self._inputBodies.addSelectionFilter(adsk.core.SelectionCommandInput.SolidBodies)
+        self._inputBodies.setSelectionLimits(0, 0)
+
+        self._inputToolAxis = inputs.addDropDownCommandInput(Input.TOOL_AXIS, 'Tool Axis', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for index, (name, _) in enumerate(ToolAxes):
+            self._inputToolAxis.listItems.add(name, index == 0)
+
         defaultToolDiameter = adsk.core.ValueInput.createByString(defaults.toolDiameter.expression)
         self._inputToolDiameter = inputs.addValueInput(Input.TOOL_DIAMETER, "Tool Diameter", defaultUnit, defaultToolDiameter)
 
@@ -49,6 +70,11 @@ class DogeBoneUI(object):
             "A piece with a tenon can be used to hide them if they're not cut all the way through the workpiece."
         )
 
+        self._inputCornerCount = inputs.addTextBoxCommandInput(Input.CORNER_COUNT, 'Corners', '', 1, True)
+
+        # the dogbone faces found on every selected body, by the entityToken of the body
+        self._bodyFaces: Dict[str, List[adsk.fusion.BRepFace]] = {}
+
         self._inputErrorMessage = inputs.addTextBoxCommandInput('inputErrorMessage', '', '', 3, True)
         self._inputErrorMessage.isFullWidth = True
 
@@ -56,7 +82,17 @@ class DogeBoneUI(object):
         self.focusNextSelectionInput()
 
     def updateVisibility(self):
-        pass
+        selectBodies = self._inputSelectBodies.value
+        self._inputFaces.isVisible = not selectBodies
+        self._inputBodies.isVisible = selectBodies
+        self._inputToolAxis.isVisible = selectBodies
+
+        # only the visible selection is required, the hidden one is dropped
+        selected, hidden = (self._inputBodies, self._inputFaces) if selectBodies else (self._inputFaces, self._inputBodies)
+        selected.setSelectionLimits(1, 0)
+        hidden.setSelectionLimits(0, 0)
+        if hidden.selectionCount > 0:
+            hidden.clearSelection()
 
     def setInputErrorMessage(self, msg):
         # We guard this statement to prevent an infinite loop of setting
@@ -73,9 +109,14 @@ class DogeBoneUI(object):
             if self._inputErrorMessage.text != '':
                 self._inputErrorMessage.text = ''
 
+    def setCornerCount(self, corners: int, faces: int):
+        text = f'{corners} on {faces} faces'
+        if self._inputCornerCount.text != text:
+            self._inputCornerCount.text = text
+
     def focusNextSelectionInput(self):
         for input in self._inputs:
-            if isinstance(input, adsk.core.SelectionCommandInput) and input.selectionCount == 0:
+            if isinstance(input, adsk.core.SelectionCommandInput) and input.isVisible and input.selectionCount == 0:
                 input.hasFocus = True
                 break
 
@@ -92,16 +133,32 @@ class DogeBoneUI(object):
     def dogeboneType(self) -> str:
         return DogboneTypeFromIndex[self._inputType.selectedItem.index]
 
-    def createInputs(self):
+    def toolAxis(self):
+        return ToolAxes[self._inputToolAxis.selectedItem.index][1]
+
+    def selectedFaces(self, snapshot: Optional[geometry.TopologySnapshot] = None) -> List[adsk.fusion.BRepFace]:
+        if not self._inputSelectBodies.value:
+            faces = self._inputFaces
+            return [cast(adsk.fusion.BRepFace, faces.selection(i).entity) for i in range(faces.selectionCount)]
+
+        # every body is searched in one pass over its edges, instead of selecting its faces one by one.
+        # The faces are kept, so selecting another body only searches that one.
+        toolAxis = self.toolAxis()
+        bodies = [cast(adsk.fusion.BRepBody, self._inputBodies.selection(i).entity) for i in range(self._inputBodies.selectionCount)]
+        bodyFaces: Dict[str, List[adsk.fusion.BRepFace]] = {}
+        for body in bodies:
+            key = f'{body.entityToken}:{toolAxis}'
+            faces = self._bodyFaces.get(key)
+            bodyFaces[key] = faces if faces is not None else geometry.findDogboneFaces(body, toolAxis, snapshot)
+        self._bodyFaces = bodyFaces
+        return [face for faces in bodyFaces.values() for face in faces]
+
+    def createInputs(self, snapshot: Optional[geometry.TopologySnapshot] = None):
         inputs = DogeboneFeatureInput()
         inputs.dogeboneType = self.dogeboneType()
         inputs.toolDiameter = self.toolDiameter()
 
-        faces = self._inputFaces
-        inputs.faces = {
-            cast(adsk.fusion.BRepFace, faces.selection(i).entity).entityToken: faces.selection(i).entity
-            for i in range(faces.selectionCount)
-        }
+        inputs.faces = {face.entityToken: face for face in self.selectedFaces(snapshot)}
 
         return inputs
 
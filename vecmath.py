@@ -0,0 +1,59 @@
+import math
+from typing import Iterable, List, Tuple
+
+# Plain tuple based vector math, so geometry decisions can be made without
+# round-trips to adsk.core.Vector3D / Point3D.
+Vector = Tuple[float, float, float]
+
+
+def add(a: Vector, b: Vector) -> Vector:
+    return a[0] + b[0], a[1] + b[1], a[2] + b[2]
+
+
+def subtract(a: Vector, b: Vector) -> Vector:
+    return a[0] - b[0], a[1] - b[1], a[2] - b[2]
+
+
+def scale(a: Vector, factor: float) -> Vector:
+    return a[0] * factor, a[1] * factor, a[2] * factor
+
+
+def dot(a: Vector, b: Vector) -> float:
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def cross(a: Vector, b: Vector) -> Vector:
+    return (
+        a[1] * b[2] - a[2] * b[1],
+        a[2] * b[0] - a[0] * b[2],
+        a[0] * b[1] - a[1] * b[0],
+    )
+
+
+def length(a: Vector) -> float:
+    return math.sqrt(dot(a, a))
+
+
+def normalize(a: Vector) -> Vector:
+    norm = length(a)
+    if norm == 0:
+        return a
+    return a[0] / norm, a[1] / norm, a[2] / norm
+
+
+def angleTo(a: Vector, b: Vector) -> float:
+    """
+    returns the angle between two vectors in radians (0..pi), mirrors Vector3D.angleTo
+    """
+    norm = length(a) * length(b)
+    if norm == 0:
+        return 0
+    return math.acos(max(-1.0, min(1.0, dot(a, b) / norm)))
+
+
+def rounded(values: Iterable[float]) -> List[float]:
+    """
+    rounds the values to the precision corners and faces are compared and stored with
+    """
+    # adding 0.0 turns -0.0 into 0.0
+    return [round(value, 6) + 0.0 for value in values]
@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+
+# Runs first in every planning worker, by path through runpy.run_path. The worker unpickles its tasks with the
+# module names of the add-in package, which it can't import by itself, so this file must not import the package
+# either: it's never imported, parallel.py passes its path and the package name and location as globals.
+
+
+def loadPackage(packageName: str, packagePath: str):
+    """
+    makes the add-in package importable under the name it has in Fusion
+    """
+    if packageName in sys.modules:
+        return
+    try:
+        if importlib.util.find_spec(packageName) is not None:
+            return
+    except (ImportError, ValueError):
+        pass
+
+    spec = importlib.util.spec_from_file_location(packageName, os.path.join(packagePath, '__init__.py'), submodule_search_locations=[packagePath])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[packageName] = module
+    spec.loader.exec_module(module)
+
+
+if __name__ == '<run_path>':
+    loadPackage(globals()['PACKAGE_NAME'], globals()['PACKAGE_PATH'])